@@ -0,0 +1,76 @@
+import os
+from app.config import AVITO_ACCOUNTS, AVITO_TOKEN_CACHE_FILE
+from .client import AvitoApiClient, get_api_client
+
+
+# Имя аккаунта, настроенного через CLIENT_ID/CLIENT_SECRET
+DEFAULT_ACCOUNT = 'default'
+
+
+class AvitoAccount:
+    """
+    Аккаунт Авито, отслеживаемый монитором
+
+    У каждого аккаунта свой клиент API (и свой токен), а пул соединений
+    и ограничитель запросов общие для всех аккаунтов процесса.
+    """
+
+    def __init__(self, name, client_id, client_secret, chat_id=None):
+        """
+        Args:
+            name (str): Уникальное имя аккаунта (используется в БД и логах).
+            client_id (str): client_id приложения Авито.
+            client_secret (str): client_secret приложения Авито.
+            chat_id (str, optional): Telegram чат для уведомлений по аккаунту.
+        """
+        self.name = name
+        self.chat_id = chat_id
+
+        if name == DEFAULT_ACCOUNT and client_id == get_api_client().client_id:
+            # Аккаунт из config обслуживает общий клиент по умолчанию
+            self.api_client = get_api_client()
+        else:
+            self.api_client = AvitoApiClient(
+                client_id=client_id,
+                client_secret=client_secret,
+                token_cache_file=_token_cache_file(name)
+            )
+
+    def __repr__(self):
+        return f"AvitoAccount({self.name!r})"
+
+
+def _token_cache_file(name):
+    """Свой файл кэша токена для каждого аккаунта: .avito_token.json -> .avito_token.<name>.json"""
+    if not AVITO_TOKEN_CACHE_FILE:
+        return None
+    root, ext = os.path.splitext(AVITO_TOKEN_CACHE_FILE)
+    return f"{root}.{name}{ext}"
+
+
+def load_accounts(accounts=None):
+    """
+    Создает аккаунты по списку настроек
+
+    Args:
+        accounts (list, optional): Список dict (name, client_id, client_secret, chat_id).
+                                   По умолчанию аккаунты из config.
+
+    Returns:
+        list: Список AvitoAccount
+    """
+    accounts = AVITO_ACCOUNTS if accounts is None else accounts
+
+    names = [account['name'] for account in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Имена аккаунтов должны быть уникальными: {names}")
+
+    return [
+        AvitoAccount(
+            name=account['name'],
+            client_id=account['client_id'],
+            client_secret=account['client_secret'],
+            chat_id=account.get('chat_id')
+        )
+        for account in accounts
+    ]
@@ -0,0 +1,158 @@
+import asyncio
+import aiohttp
+from app.config import (
+    AVITO_HTTP_CONNECT_TIMEOUT, AVITO_HTTP_READ_TIMEOUT, AVITO_HTTP_POOL_SIZE,
+    AVITO_HTTP_RETRIES, AVITO_HTTP_BACKOFF, AVITO_RATE_LIMIT_RETRIES
+)
+from .client import RETRY_STATUSES, get_api_client
+from .rate_limiter import parse_retry_after
+
+
+class AsyncAvitoApiClient:
+    """
+    Асинхронный клиент API Авито на aiohttp
+
+    Использует одну ClientSession на все время жизни процесса и тот же
+    кэш токена и ограничитель запросов, что и синхронный AvitoApiClient,
+    поэтому токен не запрашивается повторно, а лимиты API соблюдаются
+    при любом сочетании sync и async кода. Одна сессия может обслуживать
+    несколько аккаунтов: достаточно передать в запрос клиент аккаунта.
+    """
+
+    def __init__(self, api_client=None, pool_size=AVITO_HTTP_POOL_SIZE,
+                 max_retries=AVITO_HTTP_RETRIES, backoff_factor=AVITO_HTTP_BACKOFF,
+                 connect_timeout=AVITO_HTTP_CONNECT_TIMEOUT, read_timeout=AVITO_HTTP_READ_TIMEOUT):
+        """
+        Args:
+            api_client (AvitoApiClient, optional): Синхронный клиент по умолчанию, чьи
+                                                   base_url, кэш токена и ограничитель
+                                                   используются в запросах.
+            pool_size (int): Максимум одновременных соединений сессии.
+            max_retries (int): Сколько раз повторять запрос при 5xx и ошибках соединения.
+            backoff_factor (float): Базовая задержка экспоненциальной паузы между повторами.
+            connect_timeout (float): Таймаут установки соединения, сек.
+            read_timeout (float): Таймаут чтения ответа, сек.
+        """
+        self.api_client = api_client or get_api_client()
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+
+        self._session = None
+        self._session_loop = None
+
+    async def get_session(self):
+        """Возвращает общую ClientSession, создавая ее в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._session_loop = loop
+        return self._session
+
+    async def get_access_token(self, force_refresh=False, api_client=None):
+        """Возвращает access token, не блокируя event loop на время обновления"""
+        token_manager = (api_client or self.api_client).token_manager
+        if not force_refresh:
+            token = token_manager.cached_token()
+            if token:
+                return token
+        return await asyncio.to_thread(token_manager.get_token, force_refresh)
+
+    async def get_json(self, path, params=None, api_client=None):
+        """
+        Выполняет GET запрос к API Авито и возвращает разобранный JSON
+
+        Args:
+            path (str): Путь относительно base_url.
+            params (dict, optional): Параметры запроса.
+            api_client (AvitoApiClient, optional): Клиент аккаунта, от имени которого
+                                                   выполняется запрос.
+
+        Повторяет запрос с экспоненциальной паузой при 5xx и ошибках
+        соединения, после 429 - по Retry-After, при 401 один раз обновляет токен.
+
+        Raises:
+            aiohttp.ClientError: Ошибка сети или HTTP статус ошибки
+            asyncio.TimeoutError: Превышен таймаут
+            ValueError: Ответ не является JSON
+        """
+        api_client = api_client or self.api_client
+        token_manager = api_client.token_manager
+        rate_limiter = api_client.rate_limiter
+        session = await self.get_session()
+        url = f"{api_client.base_url}{path}"
+        token_refreshed = False
+        attempt = 0
+        throttled_attempts = 0
+
+        while True:
+            access_token = await self.get_access_token(api_client=api_client)
+            if not access_token:
+                raise aiohttp.ClientError("Не удалось получить access token")
+
+            headers = {"Authorization": f"Bearer {access_token}"}
+
+            try:
+                async with rate_limiter.limit_async(), \
+                        session.get(url, params=params, headers=headers) as response:
+                    if response.status == 429 and throttled_attempts < AVITO_RATE_LIMIT_RETRIES:
+                        rate_limiter.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+                        throttled_attempts += 1
+                        continue
+                    if response.status == 429:
+                        rate_limiter.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+                    else:
+                        rate_limiter.on_success()
+
+                    if response.status == 401 and not token_refreshed:
+                        # Токен отозван раньше срока - обновляем и повторяем один раз.
+                        # invalidate ждет блокировку, которую держит обновление токена в потоке,
+                        # поэтому тоже вызывается в потоке, чтобы не остановить event loop
+                        await asyncio.to_thread(token_manager.invalidate)
+                        token_refreshed = True
+                        continue
+
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        raise _RetryableStatus(response.status)
+
+                    if response.status >= 400:
+                        body = await response.text()
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=body,
+                            headers=response.headers
+                        )
+
+                    return await response.json(content_type=None)
+
+            except (_RetryableStatus, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                attempt += 1
+
+    async def close(self):
+        """Закрывает общую ClientSession"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+
+class _RetryableStatus(aiohttp.ClientError):
+    """Ответ 5xx, после которого запрос нужно повторить"""
+
+
+# Единственный асинхронный клиент API для всего приложения
+_async_api_client = None
+
+def get_async_api_client():
+    """Получить единственный экземпляр асинхронного клиента API Авито"""
+    global _async_api_client
+    if _async_api_client is None:
+        _async_api_client = AsyncAvitoApiClient()
+    return _async_api_client
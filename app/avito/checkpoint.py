@@ -0,0 +1,71 @@
+import threading
+import time
+from app.config import AVITO_PAGINATION_CHECKPOINT_TTL
+
+
+class PaginationCheckpoint:
+    """
+    Контрольная точка постраничной выгрузки объявлений
+
+    Запоминает уже полученные страницы для каждого набора параметров
+    выгрузки (статусы, дата обновления, категория). Если выгрузка
+    прервалась на одной из страниц, следующая попытка с теми же
+    параметрами запросит только недостающие страницы. Контрольная
+    точка устаревает через ttl секунд: слишком старые страницы могли
+    разойтись с текущими данными.
+    """
+
+    def __init__(self, ttl=AVITO_PAGINATION_CHECKPOINT_TTL):
+        """
+        Args:
+            ttl (int): Сколько секунд хранить полученные страницы незавершенной выгрузки.
+        """
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_page(self, key, page):
+        """Возвращает сохраненный ответ страницы или None"""
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                return None
+            return entry['pages'].get(page)
+
+    def save_page(self, key, page, page_data):
+        """Запоминает успешно полученную страницу"""
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                entry = {'created_at': time.monotonic(), 'pages': {}}
+                self._entries[key] = entry
+            entry['pages'][page] = page_data
+
+    def completed_pages(self, key):
+        """Возвращает номера уже полученных страниц"""
+        with self._lock:
+            entry = self._get_entry(key)
+            return sorted(entry['pages']) if entry else []
+
+    def clear(self, key):
+        """Удаляет контрольную точку завершенной выгрузки"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry['created_at'] > self.ttl:
+            del self._entries[key]
+            return None
+        return entry
+
+
+# Общая контрольная точка для всего процесса
+_checkpoint = None
+
+def get_pagination_checkpoint():
+    """Получить общую контрольную точку постраничной выгрузки"""
+    global _checkpoint
+    if _checkpoint is None:
+        _checkpoint = PaginationCheckpoint()
+    return _checkpoint
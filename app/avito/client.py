@@ -0,0 +1,200 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import (
+    AVITO_CLIENT_ID, AVITO_CLIENT_SECRET, AVITO_BASE_URL, AVITO_TOKEN_CACHE_FILE,
+    AVITO_HTTP_CONNECT_TIMEOUT, AVITO_HTTP_READ_TIMEOUT, AVITO_HTTP_POOL_SIZE,
+    AVITO_HTTP_RETRIES, AVITO_HTTP_BACKOFF, AVITO_RATE_LIMIT_RETRIES
+)
+from .rate_limiter import get_rate_limiter, parse_retry_after
+from .token_manager import TokenManager
+
+
+# Ответы сервера, при которых запрос безопасно повторить
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class _ApiRetry(Retry):
+    """Политика повторов urllib3, не трогающая 429: их обрабатывает RateLimiter"""
+    RETRY_AFTER_STATUS_CODES = frozenset({413, 503})
+
+
+def create_http_session(pool_size=AVITO_HTTP_POOL_SIZE, max_retries=AVITO_HTTP_RETRIES,
+                        backoff_factor=AVITO_HTTP_BACKOFF):
+    """
+    Создает requests.Session с keep-alive пулом соединений и политикой повторов
+
+    Args:
+        pool_size (int): Максимум открытых соединений к одному хосту.
+        max_retries (int): Сколько раз повторять запрос при 5xx и ошибках соединения.
+        backoff_factor (float): Базовая задержка экспоненциальной паузы между повторами.
+
+    Returns:
+        requests.Session: Настроенная сессия
+    """
+    retry = _ApiRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False  # Последний ответ отдаем вызывающему коду для raise_for_status
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        pool_block=True,  # Не открываем соединений больше, чем pool_size
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class AvitoApiClient:
+    """
+    HTTP клиент API Авито
+
+    Держит одну keep-alive сессию на все запросы, задает таймауты,
+    повторяет запросы при 5xx/ошибках соединения и подставляет
+    заголовок авторизации из кэша токена. Все запросы проходят через
+    общий ограничитель частоты, ответы 429 повторяются после Retry-After.
+    """
+
+    def __init__(self, client_id=AVITO_CLIENT_ID, client_secret=AVITO_CLIENT_SECRET,
+                 base_url=AVITO_BASE_URL, token_cache_file=AVITO_TOKEN_CACHE_FILE,
+                 session=None, timeout=(AVITO_HTTP_CONNECT_TIMEOUT, AVITO_HTTP_READ_TIMEOUT),
+                 rate_limiter=None):
+        """
+        Args:
+            client_id (str): client_id приложения Авито.
+            client_secret (str): client_secret приложения Авито.
+            base_url (str): Базовый URL API.
+            token_cache_file (str, optional): Файл для хранения токена между перезапусками.
+            session (requests.Session, optional): Сессия с пулом соединений. По умолчанию
+                                                  общая для всех клиентов процесса.
+            timeout (tuple): Таймауты (connect, read) в секундах для каждого запроса.
+            rate_limiter (RateLimiter, optional): Ограничитель запросов. По умолчанию
+                                                  общий для процесса.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = session or get_http_session()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.token_manager = TokenManager(self._fetch_token, cache_file=token_cache_file)
+
+    def get_access_token(self, force_refresh=False):
+        """Возвращает валидный access token или None в случае ошибки"""
+        return self.token_manager.get_token(force_refresh=force_refresh)
+
+    def request(self, method, path, auth=True, **kwargs):
+        """
+        Выполняет запрос к API Авито
+
+        Args:
+            method (str): HTTP метод.
+            path (str): Путь относительно base_url, например "/core/v1/items".
+            auth (bool): Подставлять ли заголовок Authorization.
+            **kwargs: Параметры requests (params, data, json, headers, timeout).
+
+        Returns:
+            requests.Response: Ответ сервера (статус не проверяется)
+
+        Raises:
+            requests.exceptions.RequestException: Ошибка сети или получения токена
+        """
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        headers = dict(kwargs.pop("headers", None) or {})
+
+        if not auth:
+            return self._send(method, url, headers, kwargs)
+
+        headers["Authorization"] = f"Bearer {self._require_token()}"
+        response = self._send(method, url, headers, kwargs)
+
+        if response.status_code == 401:
+            # Токен отозван раньше срока - обновляем и повторяем один раз
+            self.token_manager.invalidate()
+            headers["Authorization"] = f"Bearer {self._require_token()}"
+            response = self._send(method, url, headers, kwargs)
+
+        return response
+
+    def _send(self, method, url, headers, kwargs):
+        """Отправляет запрос через ограничитель, повторяя его после ответов 429"""
+        for attempt in range(AVITO_RATE_LIMIT_RETRIES + 1):
+            with self.rate_limiter.limit():
+                response = self.session.request(method, url, headers=headers, **kwargs)
+
+            if response.status_code != 429:
+                self.rate_limiter.on_success()
+                return response
+
+            self.rate_limiter.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+            if attempt < AVITO_RATE_LIMIT_RETRIES:
+                response.close()
+
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def _require_token(self):
+        access_token = self.get_access_token()
+        if not access_token:
+            raise requests.exceptions.RequestException("Не удалось получить access token")
+        return access_token
+
+    def _fetch_token(self):
+        """
+        Запрашивает новый access token у API Авито
+        Возвращает ответ /token (access_token, expires_in, ...) или None в случае ошибки
+        """
+        payload = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'grant_type': 'client_credentials'
+        }
+
+        try:
+            response = self.post("/token", auth=False, data=payload)
+            response.raise_for_status()
+
+            return response.json()
+
+        except requests.exceptions.RequestException as e:
+            print(f"Ошибка при запросе токена: {e}")
+            return None
+        except ValueError as e:
+            print(f"Ошибка декодирования ответа токена: {e}")
+            return None
+
+
+# Общий пул соединений и клиент API по умолчанию для всего приложения
+_http_session = None
+_api_client = None
+
+def get_http_session():
+    """Получить общую для всех клиентов API сессию с пулом соединений"""
+    global _http_session
+    if _http_session is None:
+        _http_session = create_http_session()
+    return _http_session
+
+
+def get_api_client():
+    """Получить единственный экземпляр клиента API Авито"""
+    global _api_client
+    if _api_client is None:
+        _api_client = AvitoApiClient()
+    return _api_client
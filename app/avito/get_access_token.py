@@ -1,30 +1,15 @@
-import requests
-from app.config import AVITO_CLIENT_ID, AVITO_CLIENT_SECRET, AVITO_BASE_URL
+from .client import get_api_client
 
 
-def get_access_token():
+def get_token_manager():
+    """Получить менеджер токена общего клиента API"""
+    return get_api_client().token_manager
+
+
+def get_access_token(force_refresh=False):
     """
     Получает access token от API Авито
+    Токен кэшируется до истечения expires_in и переиспользуется между вызовами
     Возвращает access_token или None в случае ошибки
     """
-    url = f"{AVITO_BASE_URL}/token"
-    
-    payload = {
-        'client_id': AVITO_CLIENT_ID,
-        'client_secret': AVITO_CLIENT_SECRET,
-        'grant_type': 'client_credentials'
-    }
-    
-    try:
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        
-        token_data = response.json()
-        return token_data['access_token']
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Ошибка при запросе токена: {e}")
-        return None
-    except KeyError as e:
-        print(f"Ошибка в структуре ответа: {e}")
-        return None
+    return get_api_client().get_access_token(force_refresh=force_refresh)
@@ -1,9 +1,26 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
 import requests
-from app.config import AVITO_BASE_URL
-from .get_access_token import get_access_token
+from app.config import AVITO_PAGE_WORKERS, AVITO_PAGE_RETRIES, AVITO_PAGE_RETRY_BACKOFF
+from .async_client import get_async_api_client
+from .checkpoint import get_pagination_checkpoint
+from .client import get_api_client
 
 
-def get_user_ads(status="active", per_page=100, page=1, updated_from=None, category=None):
+# Максимум записей на странице, который принимает API (per_page 1-99)
+MAX_PER_PAGE = 99
+
+
+class AvitoApiError(Exception):
+    """Не удалось получить данные из API Авито"""
+
+
+def get_user_ads(status="active", per_page=MAX_PER_PAGE, page=1, updated_from=None, category=None, api_client=None):
     """
     Получает список объявлений пользователя из API Авито.
 
@@ -11,58 +28,23 @@ def get_user_ads(status="active", per_page=100, page=1, updated_from=None, categ
         status (str, optional): Статусы объявлений (например, "active", "removed").
                                 По умолчанию "active".
                                 Можно передать несколько через запятую: "active,old".
-        per_page (int, optional): Количество записей на странице (1-99). По умолчанию 100.
+        per_page (int, optional): Количество записей на странице (1-99). По умолчанию 99.
         page (int, optional): Номер страницы (начиная с 1). По умолчанию 1.
         updated_from (str, optional): Фильтр по дате обновления (YYYY-MM-DD).
         category (int, optional): Идентификатор категории.
+        api_client (AvitoApiClient, optional): Клиент аккаунта. По умолчанию аккаунт из config.
 
     Returns:
         dict: Ответ API Авито в формате JSON, содержащий meta и resources,
             или None в случае ошибки.
     """
-    access_token = get_access_token()
-    if not access_token:
-        print("Не удалось получить access token")
-        return None
-
-    url = f"{AVITO_BASE_URL}/core/v1/items"
-
-    headers = {
-        "Authorization": f"Bearer {access_token}"
-    }
-
-    params = {
-        "status": status,
-        "per_page": per_page,
-        "page": page
-    }
-
-    if updated_from:
-        params["updatedAtFrom"] = updated_from
-    if category:
-        params["category"] = category
+    params = _build_params(status, per_page, page, updated_from, category)
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = (api_client or get_api_client()).get("/core/v1/items", params=params)
         response.raise_for_status()
 
-        data = response.json()
-
-        filtered_data = []
-        for item in data.get("resources", []):
-            filtered_item = {
-                "id": item.get("id"),
-                "title": item.get("title"),
-                "status": item.get("status"),
-                "price": item.get("price"),
-                "url": item.get("url")
-            }
-            filtered_data.append(filtered_item)
-
-        return {
-            "meta": data.get("meta", {}),
-            "resources": filtered_data
-        }
+        return _filter_page(response.json())
 
     except requests.exceptions.HTTPError as e:
         print(f"HTTP ошибка при запросе списка объявлений: {e}")
@@ -82,7 +64,141 @@ def get_user_ads(status="active", per_page=100, page=1, updated_from=None, categ
         return None
 
 
-def get_all_user_ads(status="active", updated_from=None, category=None):
+def iter_user_ad_pages(status="active", updated_from=None, category=None, max_workers=AVITO_PAGE_WORKERS,
+                       api_client=None, resume=True):
+    """
+    Генератор страниц объявлений пользователя из API Авито.
+
+    Первая страница запрашивается отдельно, по ее meta определяется число
+    страниц, остальные страницы загружаются параллельно в фоне (не больше
+    max_workers страниц впереди отдаваемой) и отдаются строго по порядку.
+    Если meta не содержит total/pages, страницы запрашиваются, пока не
+    встретится неполная страница.
+
+    Каждая страница повторяется с экспоненциальной паузой до PAGE_RETRIES раз.
+    Полученные страницы сохраняются в контрольной точке: если выгрузка
+    все же прервалась, повторный вызов с теми же параметрами запросит
+    только недостающие страницы. Страницы из контрольной точки могут
+    устареть (список мог сдвинуться), поэтому выгрузку, по которой
+    определяются удаленные объявления, нужно запускать с resume=False.
+
+    Args:
+        status (str, optional): Статусы объявлений (например, "active", "removed").
+                                Можно передать несколько через запятую: "active,old".
+        updated_from (str, optional): Фильтр по дате обновления (YYYY-MM-DD).
+        category (int, optional): Идентификатор категории.
+        max_workers (int, optional): Максимум одновременных запросов страниц.
+        api_client (AvitoApiClient, optional): Клиент аккаунта. По умолчанию аккаунт из config.
+        resume (bool, optional): Использовать контрольную точку. При False все страницы
+                                 запрашиваются заново и не копятся в памяти.
+
+    Yields:
+        list: Отфильтрованные объявления очередной страницы.
+
+    Raises:
+        AvitoApiError: Если не удалось получить одну из страниц.
+    """
+    checkpoint = get_pagination_checkpoint() if resume else None
+    api_client = api_client or get_api_client()
+    key = (api_client.client_id, status, updated_from, category)
+    if checkpoint:
+        _report_resume(checkpoint, key)
+
+    def fetch_page(page):
+        page_data = checkpoint.get_page(key, page) if checkpoint else None
+        if page_data is not None:
+            return page_data
+
+        for attempt in range(AVITO_PAGE_RETRIES + 1):
+            page_data = get_user_ads(
+                status=status,
+                per_page=MAX_PER_PAGE,
+                page=page,
+                updated_from=updated_from,
+                category=category,
+                api_client=api_client
+            )
+            if page_data:
+                if checkpoint:
+                    checkpoint.save_page(key, page, page_data)
+                return page_data
+
+            if attempt < AVITO_PAGE_RETRIES:
+                delay = _page_retry_delay(attempt)
+                print(f"Повторяем запрос страницы {page} через {delay:.1f} сек")
+                time.sleep(delay)
+
+        return None
+
+    yield from _iter_pages(fetch_page, max_workers)
+
+    # Выгрузка завершена целиком - контрольная точка больше не нужна
+    if checkpoint:
+        checkpoint.clear(key)
+
+
+def _iter_pages(fetch_page, max_workers):
+    """Обходит страницы выгрузки, загружая их параллельно в потоках"""
+    first_page = fetch_page(1)
+    if not first_page:
+        raise AvitoApiError("Ошибка при получении страницы 1")
+
+    resources = first_page.get("resources", [])
+    meta = first_page.get("meta", {})
+    # Сервер может урезать per_page, не сообщив об этом - тогда размер страницы
+    # определяем по фактической длине первой страницы
+    per_page = int(meta.get("per_page") or len(resources) or MAX_PER_PAGE)
+
+    yield resources
+
+    total_pages = _get_total_pages(meta, per_page)
+    # Неполная страница означает конец выгрузки, только если общее число неизвестно
+    if total_pages is not None and total_pages <= 1:
+        return
+    if total_pages is None and (not resources or len(resources) < per_page):
+        return
+    workers = max(1, max_workers)
+    pages = iter(range(2, total_pages + 1) if total_pages is not None else itertools.count(2))
+    # Загружаем не больше workers страниц впереди отдаваемой, чтобы в памяти
+    # не копилась вся выгрузка, пока потребитель медленно обрабатывает страницы
+    in_flight = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for page in itertools.islice(pages, workers):
+            in_flight.append((page, executor.submit(fetch_page, page)))
+
+        while in_flight:
+            page, future = in_flight.popleft()
+            page_resources = _page_resources(page, future.result())
+            next_page = next(pages, None)
+            if next_page is not None:
+                in_flight.append((next_page, executor.submit(fetch_page, next_page)))
+
+            yield page_resources
+            # Неполная страница - последняя, если общее число страниц неизвестно
+            if total_pages is None and len(page_resources) < per_page:
+                return
+    finally:
+        # Если потребитель прервал обход или страница упала - не ждем лишних запросов
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_user_ads(status="active", updated_from=None, category=None, max_workers=AVITO_PAGE_WORKERS,
+                  api_client=None):
+    """
+    Генератор объявлений пользователя из API Авито по одному.
+
+    Аргументы совпадают с iter_user_ad_pages().
+
+    Raises:
+        AvitoApiError: Если не удалось получить одну из страниц.
+    """
+    for page_resources in iter_user_ad_pages(status, updated_from, category, max_workers, api_client):
+        yield from page_resources
+
+
+def get_all_user_ads(status="active", updated_from=None, category=None, max_workers=AVITO_PAGE_WORKERS,
+                     api_client=None):
     """
     Получает ВСЕ объявления пользователя из API Авито через пагинацию.
 
@@ -92,46 +208,251 @@ def get_all_user_ads(status="active", updated_from=None, category=None):
                                 Можно передать несколько через запятую: "active,old".
         updated_from (str, optional): Фильтр по дате обновления (YYYY-MM-DD).
         category (int, optional): Идентификатор категории.
+        max_workers (int, optional): Максимум одновременных запросов страниц.
+        api_client (AvitoApiClient, optional): Клиент аккаунта. По умолчанию аккаунт из config.
+
+    Returns:
+        list: Список всех объявлений пользователя в порядке страниц,
+            или None в случае ошибки.
+    """
+    try:
+        all_ads = list(iter_user_ads(status, updated_from, category, max_workers, api_client))
+    except AvitoApiError as e:
+        print(f"Ошибка при получении данных: {e}")
+        return None
+
+    print(f"Всего получено {len(all_ads)} объявлений")
+    return all_ads
+
+
+async def get_user_ads_async(status="active", per_page=MAX_PER_PAGE, page=1, updated_from=None, category=None,
+                             api_client=None):
+    """
+    Асинхронный вариант get_user_ads() на общей aiohttp сессии.
+
+    Аргументы и формат ответа совпадают с get_user_ads().
+
+    Returns:
+        dict: {"meta": ..., "resources": [...]} или None в случае ошибки.
+    """
+    params = _build_params(status, per_page, page, updated_from, category)
+
+    try:
+        data = await get_async_api_client().get_json("/core/v1/items", params=params, api_client=api_client)
+        return _filter_page(data)
+
+    except aiohttp.ClientResponseError as e:
+        print(f"HTTP ошибка при запросе списка объявлений: {e.status}")
+        print(f"Тело ответа: {e.message}")
+        return None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Ошибка сети при запросе списка объявлений: {e!r}")
+        return None
+    except ValueError as e:
+        print(f"Ошибка декодирования JSON ответа: {e}")
+        return None
+
+
+async def iter_user_ad_pages_async(status="active", updated_from=None, category=None, max_workers=AVITO_PAGE_WORKERS,
+                                   api_client=None, resume=True):
+    """
+    Асинхронный вариант iter_user_ad_pages(): не блокирует event loop.
+
+    Пока потребитель обрабатывает очередную страницу, следующие
+    загружаются в фоне (не более max_workers одновременно). Повторы
+    страниц и контрольная точка работают так же, как в iter_user_ad_pages().
+
+    Yields:
+        list: Отфильтрованные объявления очередной страницы.
+
+    Raises:
+        AvitoApiError: Если не удалось получить одну из страниц.
+    """
+    checkpoint = get_pagination_checkpoint() if resume else None
+    api_client = api_client or get_api_client()
+    key = (api_client.client_id, status, updated_from, category)
+    if checkpoint:
+        _report_resume(checkpoint, key)
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def fetch_page(page):
+        page_data = checkpoint.get_page(key, page) if checkpoint else None
+        if page_data is not None:
+            return page_data
+
+        for attempt in range(AVITO_PAGE_RETRIES + 1):
+            async with semaphore:
+                page_data = await get_user_ads_async(
+                    status=status,
+                    per_page=MAX_PER_PAGE,
+                    page=page,
+                    updated_from=updated_from,
+                    category=category,
+                    api_client=api_client
+                )
+            if page_data:
+                if checkpoint:
+                    checkpoint.save_page(key, page, page_data)
+                return page_data
+
+            if attempt < AVITO_PAGE_RETRIES:
+                delay = _page_retry_delay(attempt)
+                print(f"Повторяем запрос страницы {page} через {delay:.1f} сек")
+                await asyncio.sleep(delay)
+
+        return None
+
+    async for page_resources in _aiter_pages(fetch_page, max_workers):
+        yield page_resources
+
+    if checkpoint:
+        checkpoint.clear(key)
+
+
+async def _aiter_pages(fetch_page, max_workers):
+    """Обходит страницы выгрузки, загружая их параллельно задачами event loop"""
+    first_page = await fetch_page(1)
+    if not first_page:
+        raise AvitoApiError("Ошибка при получении страницы 1")
+
+    resources = first_page.get("resources", [])
+    meta = first_page.get("meta", {})
+    # Сервер может урезать per_page, не сообщив об этом - тогда размер страницы
+    # определяем по фактической длине первой страницы
+    per_page = int(meta.get("per_page") or len(resources) or MAX_PER_PAGE)
+
+    yield resources
+
+    total_pages = _get_total_pages(meta, per_page)
+    # Неполная страница означает конец выгрузки, только если общее число неизвестно
+    if total_pages is not None and total_pages <= 1:
+        return
+    if total_pages is None and (not resources or len(resources) < per_page):
+        return
+    workers = max(1, max_workers)
+    pages = iter(range(2, total_pages + 1) if total_pages is not None else itertools.count(2))
+    # Не больше workers страниц впереди отдаваемой, как в _iter_pages
+    in_flight = deque()
+    try:
+        for page in itertools.islice(pages, workers):
+            in_flight.append((page, asyncio.create_task(fetch_page(page))))
+
+        while in_flight:
+            page, task = in_flight.popleft()
+            page_resources = _page_resources(page, await task)
+            next_page = next(pages, None)
+            if next_page is not None:
+                in_flight.append((next_page, asyncio.create_task(fetch_page(next_page))))
+
+            yield page_resources
+            if total_pages is None and len(page_resources) < per_page:
+                return
+    finally:
+        for _, task in in_flight:
+            task.cancel()
+
+
+async def iter_user_ads_async(status="active", updated_from=None, category=None, max_workers=AVITO_PAGE_WORKERS,
+                              api_client=None):
+    """
+    Асинхронный генератор объявлений пользователя по одному.
+
+    Raises:
+        AvitoApiError: Если не удалось получить одну из страниц.
+    """
+    async for page_resources in iter_user_ad_pages_async(status, updated_from, category, max_workers, api_client):
+        for ad in page_resources:
+            yield ad
+
+
+async def get_all_user_ads_async(status="active", updated_from=None, category=None, max_workers=AVITO_PAGE_WORKERS,
+                                 api_client=None):
+    """
+    Асинхронный вариант get_all_user_ads(): не блокирует event loop.
+
+    Аргументы и формат ответа совпадают с get_all_user_ads().
 
     Returns:
-        list: Список всех объявлений пользователя,
+        list: Список всех объявлений пользователя в порядке страниц,
             или None в случае ошибки.
     """
-    all_ads = []
-    page = 1
-    per_page = 100  # Максимальное количество на странице
-    
-    while True:
-        page_data = get_user_ads(
-            status=status,
-            per_page=per_page,
-            page=page,
-            updated_from=updated_from,
-            category=category
-        )
-
-        if not page_data:
-            print("Ошибка при получении данных")
-            return None
-            
-        resources = page_data.get("resources", [])
-        
-        if not resources:
-            # Если на странице нет объявлений, значит достигли конца
-            break
-            
-        all_ads.extend(resources)
-        
-        # Если получили меньше объявлений, чем запрашивали, значит это последняя страница
-        if len(resources) < per_page:
-            break
-            
-        page += 1
-    
+    try:
+        all_ads = [ad async for ad in iter_user_ads_async(status, updated_from, category, max_workers, api_client)]
+    except AvitoApiError as e:
+        print(f"Ошибка при получении данных: {e}")
+        return None
+
     print(f"Всего получено {len(all_ads)} объявлений")
     return all_ads
 
 
+def _build_params(status, per_page, page, updated_from, category):
+    """Собирает параметры запроса /core/v1/items"""
+    params = {
+        "status": status,
+        "per_page": per_page,
+        "page": page
+    }
+
+    if updated_from:
+        params["updatedAtFrom"] = updated_from
+    if category:
+        params["category"] = category
+
+    return params
+
+
+def _filter_page(data):
+    """Оставляет в ответе API только нужные поля объявлений"""
+    filtered_data = []
+    for item in data.get("resources", []):
+        filtered_item = {
+            "id": item.get("id"),
+            "title": item.get("title"),
+            "status": item.get("status"),
+            "price": item.get("price"),
+            "url": item.get("url")
+        }
+        filtered_data.append(filtered_item)
+
+    return {
+        "meta": data.get("meta", {}),
+        "resources": filtered_data
+    }
+
+
+def _report_resume(checkpoint, key):
+    """Сообщает, что выгрузка продолжается с контрольной точки"""
+    completed = checkpoint.completed_pages(key)
+    if completed:
+        print(f"Продолжаем прерванную выгрузку: уже получено страниц - {len(completed)}")
+
+
+def _page_retry_delay(attempt):
+    """Экспоненциальная пауза перед повторным запросом страницы"""
+    return AVITO_PAGE_RETRY_BACKOFF * (2 ** attempt)
+
+
+def _page_resources(page, page_data):
+    """Возвращает объявления страницы или бросает AvitoApiError, если страница не получена"""
+    if not page_data:
+        raise AvitoApiError(f"Ошибка при получении страницы {page}")
+    return page_data.get("resources", [])
+
+
+def _get_total_pages(meta, per_page):
+    """Возвращает число страниц по meta ответа или None, если meta его не содержит"""
+    pages = meta.get("pages") or meta.get("total_pages")
+    if pages:
+        return int(pages)
+
+    total = meta.get("total")
+    if total is not None:
+        return max(1, math.ceil(int(total) / per_page))
+
+    return None
+
+
 if __name__ == "__main__":
     ads = get_all_user_ads(status="active")
     print(ads)  # Выводим полученные объявления для проверки
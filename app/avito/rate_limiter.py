@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from app.config import AVITO_RATE_LIMIT, AVITO_RATE_BURST, AVITO_MAX_CONCURRENCY
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов к API Авито
+
+    Сочетает token bucket (не более rate запросов в секунду с запасом burst)
+    и лимит одновременных запросов. При ответе 429 выдерживает паузу
+    Retry-After для всех запросов процесса, вдвое снижает частоту и
+    параллельность, а после серии успешных ответов постепенно
+    возвращает их к исходным значениям.
+
+    Один экземпляр безопасно использовать одновременно из потоков и из event loop.
+    """
+
+    # Сколько успешных ответов подряд нужно для шага восстановления лимитов
+    RECOVERY_STEP = 10
+
+    def __init__(self, rate=AVITO_RATE_LIMIT, burst=AVITO_RATE_BURST, max_concurrency=AVITO_MAX_CONCURRENCY,
+                 min_rate=0.5):
+        """
+        Args:
+            rate (float): Максимум запросов в секунду.
+            burst (int): Сколько запросов можно сделать подряд без ожидания.
+            max_concurrency (int): Максимум одновременных запросов.
+            min_rate (float): Ниже этой частоты лимит не снижается при троттлинге.
+        """
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.burst = max(1, int(burst))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency = self.max_concurrency
+
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._successes = 0
+
+        self._lock = threading.Lock()
+        self._slot_released = threading.Condition(self._lock)
+
+    @contextmanager
+    def limit(self):
+        """Синхронно ждет разрешения на запрос и удерживает слот параллельности"""
+        with self._slot_released:
+            while self._active >= self.concurrency:
+                self._slot_released.wait()
+            self._active += 1
+
+        try:
+            delay = self._reserve()
+            if delay > 0:
+                time.sleep(delay)
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def limit_async(self):
+        """Асинхронный вариант limit(): ожидание не блокирует event loop"""
+        while True:
+            with self._lock:
+                if self._active < self.concurrency:
+                    self._active += 1
+                    break
+            await asyncio.sleep(0.05)
+
+        try:
+            delay = self._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self._release()
+
+    def on_success(self):
+        """Успешный ответ: понемногу восстанавливаем частоту и параллельность"""
+        with self._lock:
+            self._successes += 1
+            if self._successes < self.RECOVERY_STEP:
+                return
+            self._successes = 0
+
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + max(self.max_rate / 10, 0.1))
+            if self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._slot_released.notify()
+
+    def on_throttled(self, retry_after=None):
+        """
+        Ответ 429: приостанавливает все запросы и снижает лимиты
+
+        Args:
+            retry_after (float, optional): Пауза из заголовка Retry-After, сек.
+                                           Если не указана - пауза 1/rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            # Одновременные запросы получают 429 пачкой - снижаем лимиты один раз на паузу
+            already_paused = now < self._paused_until
+            self._paused_until = max(self._paused_until, now + pause)
+            self._tokens = min(self._tokens, 0.0)
+            self._successes = 0
+
+            if already_paused:
+                return
+
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.concurrency = max(1, self.concurrency // 2)
+
+            print(f"⚠️ API Авито ограничивает частоту запросов: пауза {pause:.1f} сек, "
+                  f"лимит {self.rate:.2f} запр/сек, параллельно {self.concurrency}")
+
+    def get_stats(self):
+        """Возвращает текущие лимиты для мониторинга"""
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'max_rate': self.max_rate,
+                'concurrency': self.concurrency,
+                'max_concurrency': self.max_concurrency,
+                'active': self._active,
+                'paused_for': max(0.0, self._paused_until - time.monotonic())
+            }
+
+    def _reserve(self):
+        """Резервирует токен и возвращает, сколько секунд нужно подождать перед запросом"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            # Токены могут уходить в минус: это очередь уже зарезервированных запросов
+            self._tokens -= 1
+            token_delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            return max(token_delay, self._paused_until - now)
+
+    def _release(self):
+        with self._slot_released:
+            self._active -= 1
+            self._slot_released.notify()
+
+
+def parse_retry_after(value):
+    """
+    Разбирает заголовок Retry-After (секунды или HTTP дата)
+
+    Returns:
+        float: Пауза в секундах или None, если заголовок отсутствует или некорректен
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Единственный ограничитель на весь процесс
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Получить общий для процесса ограничитель запросов к API Авито"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+
+
+class TokenManager:
+    """
+    Кэш access token для API Авито с учетом срока жизни
+
+    Токен хранится в памяти и (опционально) в локальном файле, чтобы
+    перезапуски и соседние процессы переиспользовали еще валидный токен.
+    Обновление выполняется заранее, за refresh_margin секунд до истечения.
+    Параллельные вызовы разделяют одно обновление: пока один поток
+    запрашивает новый токен, остальные ждут его результат.
+    """
+
+    def __init__(self, fetch_token, cache_file=None, refresh_margin=60):
+        """
+        Args:
+            fetch_token (callable): Функция без аргументов, возвращающая ответ
+                                    /token в виде dict (access_token, expires_in)
+                                    или None в случае ошибки.
+            cache_file (str, optional): Путь к файлу для хранения токена.
+                                        None - хранить только в памяти.
+            refresh_margin (int, optional): За сколько секунд до истечения
+                                            считать токен устаревшим.
+        """
+        self.fetch_token = fetch_token
+        self.cache_file = cache_file
+        self.refresh_margin = refresh_margin
+
+        self._access_token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get_token(self, force_refresh=False):
+        """
+        Возвращает валидный access token, при необходимости обновляя его
+
+        Args:
+            force_refresh (bool, optional): Игнорировать кэш и запросить новый токен.
+
+        Returns:
+            str: access token или None в случае ошибки
+        """
+        if not force_refresh:
+            token = self.cached_token()
+            if token:
+                return token
+
+        # Запоминаем токен, который считали устаревшим: если за время ожидания
+        # блокировки другой поток его уже заменил - повторно не запрашиваем
+        stale_token = self._access_token
+
+        with self._lock:
+            if self._is_valid() and (not force_refresh or self._access_token != stale_token):
+                return self._access_token
+
+            if not force_refresh and self._load_from_file():
+                return self._access_token
+
+            return self._refresh()
+
+    def cached_token(self):
+        """Возвращает токен из памяти, если он еще валиден, иначе None"""
+        if self._is_valid():
+            return self._access_token
+        return None
+
+    def invalidate(self):
+        """Сбрасывает токен (например, после ответа 401)"""
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0
+
+    def _is_valid(self):
+        return bool(self._access_token) and time.time() < self._expires_at - self.refresh_margin
+
+    def _refresh(self):
+        """Запрашивает новый токен. Вызывается под блокировкой"""
+        token_data = self.fetch_token()
+        if not token_data:
+            return None
+
+        try:
+            access_token = token_data['access_token']
+        except KeyError as e:
+            print(f"Ошибка в структуре ответа: {e}")
+            return None
+
+        expires_in = token_data.get('expires_in') or 0
+        self._access_token = access_token
+        self._expires_at = time.time() + int(expires_in)
+
+        self._save_to_file()
+        return self._access_token
+
+    def _load_from_file(self):
+        """Подхватывает токен, сохраненный этим или соседним процессом"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return False
+
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            access_token = data['access_token']
+            expires_at = float(data['expires_at'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Не удалось прочитать кэш токена {self.cache_file}: {e}")
+            return False
+
+        if not access_token or time.time() >= expires_at - self.refresh_margin:
+            return False
+
+        self._access_token = access_token
+        self._expires_at = expires_at
+        return True
+
+    def _save_to_file(self):
+        """Атомарно сохраняет токен в файл, чтобы читатели не видели частичную запись"""
+        if not self.cache_file:
+            return
+
+        tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'access_token': self._access_token,
+                    'expires_at': self._expires_at
+                }, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            print(f"Не удалось сохранить кэш токена {self.cache_file}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -1,9 +1,19 @@
+import json
 import os
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
+
+def _env_flag(name, default):
+    """Читает булев флаг из окружения (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 AVITO_CLIENT_ID = os.getenv('CLIENT_ID')
 AVITO_CLIENT_SECRET = os.getenv('CLIENT_SECRET')
 
@@ -12,8 +22,145 @@ TELEGRAM_CHAT_ID = os.getenv('CHAT_ID')
 
 AVITO_BASE_URL = os.getenv('BASE_URL')
 
+# Файл для хранения access token между перезапусками (пустая строка - только в памяти)
+AVITO_TOKEN_CACHE_FILE = os.getenv('TOKEN_CACHE_FILE', '.avito_token.json') or None
+
+# HTTP клиент API Авито: таймауты (сек), размер пула соединений, повторы при 5xx
+AVITO_HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+AVITO_HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+AVITO_HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+AVITO_HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))
+AVITO_HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))
+
+# Сколько страниц списка объявлений загружать одновременно
+AVITO_PAGE_WORKERS = int(os.getenv('PAGE_WORKERS', '4'))
+
+# Повторы одной страницы выгрузки (пауза PAGE_RETRY_BACKOFF * 2^попытка сек) и сколько секунд
+# хранить уже полученные страницы прерванной выгрузки для ее продолжения
+AVITO_PAGE_RETRIES = int(os.getenv('PAGE_RETRIES', '3'))
+AVITO_PAGE_RETRY_BACKOFF = float(os.getenv('PAGE_RETRY_BACKOFF', '1'))
+AVITO_PAGINATION_CHECKPOINT_TTL = int(os.getenv('PAGINATION_CHECKPOINT_TTL', str(15 * 60)))
+
+# Ограничение запросов к API Авито на весь процесс: запросов в секунду, запас подряд,
+# максимум одновременных запросов и сколько раз повторять запрос после ответа 429
+AVITO_RATE_LIMIT = float(os.getenv('RATE_LIMIT', '5'))
+AVITO_RATE_BURST = int(os.getenv('RATE_BURST', '10'))
+AVITO_MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', str(AVITO_PAGE_WORKERS)))
+AVITO_RATE_LIMIT_RETRIES = int(os.getenv('RATE_LIMIT_RETRIES', '5'))
+
+# Инкрементальная синхронизация: в обычных циклах запрашиваются только объявления,
+# обновленные с последней успешной синхронизации; полная сверка - раз в FULL_SYNC_INTERVAL сек
+INCREMENTAL_SYNC = _env_flag('INCREMENTAL_SYNC', True)
+FULL_SYNC_INTERVAL = int(os.getenv('FULL_SYNC_INTERVAL', str(6 * 60 * 60)))
+
+# Опрос по группам статусов (при выключенной INCREMENTAL_SYNC): между полными сверками
+# активные объявления запрашиваются каждые ACTIVE_POLL_INTERVAL сек, архивные - реже.
+# Объявления, не попавшие в опрос, не считаются удаленными.
+# Если TIERED_POLLING и INCREMENTAL_SYNC выключены, каждый цикл - полная сверка
+TIERED_POLLING = _env_flag('TIERED_POLLING', True)
+POLL_TIERS = {
+    'active': (os.getenv('ACTIVE_POLL_STATUSES', 'active,blocked,rejected'),
+               int(os.getenv('ACTIVE_POLL_INTERVAL', '0'))),
+    'archive': (os.getenv('ARCHIVE_POLL_STATUSES', 'old,removed'),
+                int(os.getenv('ARCHIVE_POLL_INTERVAL', str(60 * 60)))),
+}
+
 PROXY_SERVER = os.getenv('PROXY_SERVER')
-PROXY_ENABLED = True
+PROXY_ENABLED = _env_flag('PROXY_ENABLED', True)
+
+# Пул прокси парсера: PROXY_SERVERS через запятую (по умолчанию - один PROXY_SERVER).
+# Заблокированный прокси уходит в карантин на PROXY_COOLDOWN сек, удваивающийся
+# при повторных блокировках до PROXY_MAX_COOLDOWN
+PROXY_SERVERS = [
+    proxy.strip() for proxy in os.getenv('PROXY_SERVERS', '').split(',') if proxy.strip()
+] or ([PROXY_SERVER] if PROXY_SERVER else [])
+PROXY_COOLDOWN = float(os.getenv('PROXY_COOLDOWN', '60'))
+PROXY_MAX_COOLDOWN = float(os.getenv('PROXY_MAX_COOLDOWN', str(60 * 60)))
+
+# Пул браузеров парсера страниц: сколько браузеров держать запущенными
+# и через сколько страниц перезапускать браузер
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '1'))
+BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', '50'))
+
+# Сколько вкладок одного браузера загружают разные объявления одновременно
+# (1 - страницы по одной). Вкладки дешевле отдельных браузеров по памяти
+PARSER_TABS = int(os.getenv('PARSER_TABS', '1'))
+
+# Готовность страницы: сколько секунд ждать описание и фото галереи (или затишья в сети)
+# и верхняя граница случайных "человеческих" пауз парсера, сек
+PARSER_READY_TIMEOUT = float(os.getenv('PARSER_READY_TIMEOUT', '10'))
+PARSER_MAX_HUMAN_DELAY = float(os.getenv('PARSER_MAX_HUMAN_DELAY', '1'))
+
+# Сколько раз перезагружать страницу в той же сессии, прежде чем сменить прокси
+# (перезапуск браузера - только если он перестал отвечать)
+PARSER_RELOADS = int(os.getenv('PARSER_RELOADS', '1'))
+
+# Быстрый путь: сначала пробуем получить страницу обычным HTTP запросом,
+# браузер запускается только при блокировке или если данных в HTML нет
+PARSER_HTTP_FAST_PATH = _env_flag('PARSER_HTTP_FAST_PATH', True)
+PARSER_HTTP_TIMEOUT = float(os.getenv('PARSER_HTTP_TIMEOUT', '10'))
+
+# Не загружать в браузере картинки, видео, шрифты и трекеры: ссылки на фото
+# берутся из DOM и состояния страницы, а трафик через прокси платный
+PARSER_BLOCK_RESOURCES = _env_flag('PARSER_BLOCK_RESOURCES', True)
+
+# Каталог постоянных профилей браузера (cookies, кэш, local storage между запусками).
+# Пустое значение - каждый браузер запускается с чистым профилем
+PARSER_PROFILES_DIR = os.getenv('PARSER_PROFILES_DIR', 'browser_profiles')
+
+# Архив HTML разобранных страниц (gzip) для повторного извлечения данных после
+# смены верстки: каталог (пустое значение - архив выключен, например html_archive)
+# и сколько последних загрузок каждой страницы хранить
+PARSER_ARCHIVE_DIR = os.getenv('PARSER_ARCHIVE_DIR', '')
+PARSER_ARCHIVE_VERSIONS = int(os.getenv('PARSER_ARCHIVE_VERSIONS', '3'))
+
+# Параллельный парсинг страниц в отдельных процессах: количество воркеров,
+# по умолчанию по одному на прокси из PROXY_SERVERS
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(max(1, len(PROXY_SERVERS)))))
+
+# Сколько раз воркер может отложить страницу после блокировки или ошибки
+# (вместо паузы) - дальше парсинг повторяется с ожиданием внутри задачи
+PARSE_MAX_DEFERRALS = int(os.getenv('PARSE_MAX_DEFERRALS', '3'))
+
+# Сколько раз подряд перезапускать воркер парсинга, который падает, не успев начать
+# работу (паузы между попытками растут: 1, 2, 4... сек) - дальше он не запускается
+PARSE_WORKER_MAX_RESTARTS = int(os.getenv('PARSE_WORKER_MAX_RESTARTS', '5'))
+
+# Кэш результатов парсинга страниц по ID объявления (в базе данных): сколько секунд
+# результат считается актуальным и сколько записей хранить (лишние вытесняются по LRU)
+PARSE_CACHE_ENABLED = _env_flag('PARSE_CACHE_ENABLED', True)
+PARSE_CACHE_TTL = int(os.getenv('PARSE_CACHE_TTL', str(7 * 24 * 3600)))
+PARSE_CACHE_MAX_ITEMS = int(os.getenv('PARSE_CACHE_MAX_ITEMS', '5000'))
+
+# Несколько аккаунтов Авито в одном процессе: JSON файл со списком
+# [{"name": ..., "client_id": ..., "client_secret": ..., "chat_id": ...}, ...].
+# Без файла используется один аккаунт из CLIENT_ID/CLIENT_SECRET/CHAT_ID
+AVITO_ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE')
+
+
+def _load_accounts():
+    """Загружает настройки аккаунтов из ACCOUNTS_FILE или из переменных окружения"""
+    if not AVITO_ACCOUNTS_FILE:
+        return [{
+            'name': 'default',
+            'client_id': AVITO_CLIENT_ID,
+            'client_secret': AVITO_CLIENT_SECRET,
+            'chat_id': TELEGRAM_CHAT_ID
+        }]
+
+    with open(AVITO_ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
+        accounts = json.load(f)
+
+    for index, account in enumerate(accounts, 1):
+        missing = [key for key in ('name', 'client_id', 'client_secret') if not account.get(key)]
+        if missing:
+            raise ValueError(f"В аккаунте №{index} из {AVITO_ACCOUNTS_FILE} не заданы: {', '.join(missing)}")
+        account.setdefault('chat_id', TELEGRAM_CHAT_ID)
+
+    return accounts
+
+
+AVITO_ACCOUNTS = _load_accounts()
 
 required_vars = {
     'CLIENT_ID': AVITO_CLIENT_ID,
@@ -28,10 +28,16 @@ class DatabaseManager:
                         is_posted_to_telegram BOOLEAN DEFAULT 0,
                         has_photo BOOLEAN DEFAULT 0,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        account TEXT NOT NULL DEFAULT 'default'
                     )
                 """)
                 
+                # Базы, созданные до поддержки нескольких аккаунтов, дополняем колонкой account
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(items)")]
+                if 'account' not in columns:
+                    conn.execute("ALTER TABLE items ADD COLUMN account TEXT NOT NULL DEFAULT 'default'")
+                
                 # Создаем индексы для быстрого поиска
                 conn.execute("""
                     CREATE INDEX IF NOT EXISTS idx_status 
@@ -43,6 +49,20 @@ class DatabaseManager:
                     ON items(is_posted_to_telegram)
                 """)
                 
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_account 
+                    ON items(account)
+                """)
+                
+                # Служебные значения синхронизации (например, время последней выгрузки)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS sync_state (
+                        key TEXT PRIMARY KEY,
+                        value TEXT,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
                 conn.commit()
                 print(f"✅ База данных инициализирована: {self.db_path}")
                 
@@ -87,6 +107,34 @@ class DatabaseManager:
             print(f"❌ Ошибка при получении информации о БД: {e}")
             return None
     
+    def get_sync_state(self, key, default=None):
+        """
+        Возвращает сохраненное значение состояния синхронизации
+        
+        Args:
+            key (str): Ключ значения
+            default: Значение, если ключ не найден или произошла ошибка
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+                row = cursor.fetchone()
+                return row[0] if row else default
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка чтения состояния синхронизации {key}: {e}")
+            return default
+    
+    def set_sync_state(self, key, value):
+        """Сохраняет значение состояния синхронизации"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO sync_state (key, value, updated_at)
+                    VALUES (?, ?, ?)
+                """, (key, value, datetime.now()))
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка сохранения состояния синхронизации {key}: {e}")
+    
     def clear_database(self):
         """
         ОСТОРОЖНО! Удаляет все данные из таблицы
@@ -0,0 +1,199 @@
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from app.config import PARSE_CACHE_TTL, PARSE_CACHE_MAX_ITEMS
+
+
+# ID объявления в конце URL Авито: .../nazvanie_1234567890
+ITEM_ID_RE = re.compile(r'_(\d+)(?:[/?#]|$)')
+
+
+def item_id_from_url(url):
+    """Извлекает ID объявления из URL или возвращает None"""
+    match = ITEM_ID_RE.search(url or '')
+    return int(match.group(1)) if match else None
+
+
+class ParseCache:
+    """
+    Постоянный кэш результатов парсинга страниц объявлений
+
+    Хранит описание и фото по ID объявления (и URL) в SQLite, чтобы
+    после падения, повторной обработки или перепубликации не парсить
+    ту же страницу заново. Записи старше ttl секунд не выдаются,
+    а при превышении max_items удаляются давно не запрашивавшиеся (LRU).
+    """
+
+    def __init__(self, db_path="avito_monitor.db", ttl=PARSE_CACHE_TTL, max_items=PARSE_CACHE_MAX_ITEMS):
+        """
+        Args:
+            db_path (str): Путь к файлу базы данных.
+            ttl (int): Сколько секунд результат парсинга считается актуальным.
+            max_items (int): Максимум записей в кэше.
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self.init_cache()
+
+    def init_cache(self):
+        """Создает таблицу кэша, если ее нет"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS parse_cache (
+                        item_id INTEGER PRIMARY KEY,
+                        url TEXT,
+                        description TEXT,
+                        images TEXT,
+                        parsed_at TIMESTAMP,
+                        accessed_at TIMESTAMP
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_parse_cache_url ON parse_cache(url)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_parse_cache_accessed ON parse_cache(accessed_at)")
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка при создании кэша парсинга: {e}")
+            raise
+
+    def get(self, item_id=None, url=None):
+        """
+        Возвращает сохраненный результат парсинга
+
+        Args:
+            item_id (int, optional): ID объявления. Если не указан - берется из URL.
+            url (str, optional): URL объявления.
+
+        Returns:
+            dict: {'description': str, 'images': list} или None, если записи нет или она устарела
+        """
+        item_id = item_id or item_id_from_url(url)
+        if item_id is None and not url:
+            return None
+
+        now = datetime.now()
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                if item_id is not None:
+                    row = conn.execute("""
+                        SELECT item_id, description, images FROM parse_cache
+                        WHERE item_id = ? AND parsed_at >= ?
+                    """, (item_id, now - timedelta(seconds=self.ttl))).fetchone()
+                else:
+                    row = conn.execute("""
+                        SELECT item_id, description, images FROM parse_cache
+                        WHERE url = ? AND parsed_at >= ?
+                    """, (url, now - timedelta(seconds=self.ttl))).fetchone()
+
+                if not row:
+                    return None
+
+                conn.execute("UPDATE parse_cache SET accessed_at = ? WHERE item_id = ?", (now, row[0]))
+                return {'description': row[1], 'images': json.loads(row[2] or '[]')}
+        except (sqlite3.Error, ValueError) as e:
+            print(f"❌ Ошибка чтения кэша парсинга: {e}")
+            return None
+
+    def put(self, result, item_id=None, url=None):
+        """
+        Сохраняет результат парсинга
+
+        Пустой результат (нет ни описания, ни фото) не сохраняется: страница
+        могла не догрузиться, и ее нужно разобрать заново.
+
+        Args:
+            result (dict): {'description': str, 'images': list}.
+            item_id (int, optional): ID объявления. Если не указан - берется из URL.
+            url (str, optional): URL объявления.
+        """
+        item_id = item_id or item_id_from_url(url)
+        if not result or not (result.get('description') or result.get('images')) or item_id is None:
+            return
+
+        now = datetime.now()
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO parse_cache
+                    (item_id, url, description, images, parsed_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    item_id,
+                    url,
+                    result.get('description'),
+                    json.dumps(result.get('images') or [], ensure_ascii=False),
+                    now,
+                    now
+                ))
+
+                # Вытесняем давно не запрашивавшиеся записи сверх лимита
+                conn.execute("""
+                    DELETE FROM parse_cache WHERE item_id IN (
+                        SELECT item_id FROM parse_cache
+                        ORDER BY accessed_at DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_items,))
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка записи в кэш парсинга: {e}")
+
+    def invalidate(self, item_id=None, url=None):
+        """Удаляет результат парсинга объявления, чтобы страница была разобрана заново"""
+        item_id = item_id or item_id_from_url(url)
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                if item_id is not None:
+                    conn.execute("DELETE FROM parse_cache WHERE item_id = ?", (item_id,))
+                elif url:
+                    conn.execute("DELETE FROM parse_cache WHERE url = ?", (url,))
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка удаления из кэша парсинга: {e}")
+
+    def clear(self):
+        """Очищает весь кэш"""
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute("DELETE FROM parse_cache")
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка очистки кэша парсинга: {e}")
+
+    def purge_expired(self):
+        """Удаляет устаревшие записи и возвращает их количество"""
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                cursor = conn.execute(
+                    "DELETE FROM parse_cache WHERE parsed_at < ?",
+                    (datetime.now() - timedelta(seconds=self.ttl),)
+                )
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка очистки кэша парсинга: {e}")
+            return 0
+
+    def get_stats(self):
+        """Возвращает размер кэша для мониторинга"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                total = conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+                fresh = conn.execute(
+                    "SELECT COUNT(*) FROM parse_cache WHERE parsed_at >= ?",
+                    (datetime.now() - timedelta(seconds=self.ttl),)
+                ).fetchone()[0]
+            return {'total': total, 'fresh': fresh, 'max_items': self.max_items, 'ttl': self.ttl}
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка чтения статистики кэша парсинга: {e}")
+            return None
+
+
+# Единственный кэш парсинга для всего приложения
+_parse_cache = None
+
+def get_parse_cache():
+    """Получить единственный экземпляр кэша парсинга"""
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParseCache()
+    return _parse_cache
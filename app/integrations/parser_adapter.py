@@ -1,8 +1,8 @@
 import asyncio
-import random
-import time
 from loguru import logger
-from ..parser.parser_description_and_photo import get_parser
+from ..parser.parse_engine import get_parse_engine
+from ..database.parse_cache import get_parse_cache
+from ..config import PARSE_CACHE_ENABLED
 
 
 class AvitoParserAdapter:
@@ -12,7 +12,8 @@ class AvitoParserAdapter:
     """
     
     def __init__(self):
-        self.parser = get_parser()
+        self.engine = get_parse_engine()
+        self.cache = get_parse_cache() if PARSE_CACHE_ENABLED else None
         logger.info("🔧 Адаптер парсера инициализирован")
     
     async def get_item_details_async(self, item_url):
@@ -28,13 +29,12 @@ class AvitoParserAdapter:
         try:
             logger.info(f"🔍 Запрашиваем детали: {item_url}")
             
-            # Запускаем парсинг в отдельном потоке чтобы не блокировать асинхронность
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, 
-                self.parser.parse_item_page, 
-                item_url
-            )
+            result = await asyncio.to_thread(self.cache.get, url=item_url) if self.cache else None
+            if not result:
+                # Парсинг идет в процессе-воркере и не блокирует асинхронность
+                result = await self.engine.parse_async(item_url)
+                if result and self.cache:
+                    await asyncio.to_thread(self.cache.put, result, url=item_url)
             
             if result:
                 description = result.get('description')
@@ -52,38 +52,46 @@ class AvitoParserAdapter:
     
     def parse_multiple_items_sync(self, item_urls, delay_range=(5, 8)):
         """
-        Синхронно парсит несколько объявлений с задержками как в оригинальном parser_cls
+        Синхронно парсит несколько объявлений параллельно всеми воркерами
         
         Args:
             item_urls (list): Список URL
-            delay_range (tuple): Диапазон задержек между запросами
+            delay_range (tuple): Диапазон пауз каждого воркера между своими запросами
             
         Returns:
             dict: {url: {'description': str, 'images': list}}
         """
+        logger.info(f"🔍 Парсим {len(item_urls)} объявлений, воркеров: {self.engine.workers}")
+        
         results = {}
+        cached = {}
+        if self.cache:
+            cached = {url: self.cache.get(url=url) for url in item_urls}
+            cached = {url: result for url, result in cached.items() if result}
+            if cached:
+                logger.info(f"📦 Из кэша парсинга: {len(cached)}")
         
-        for i, url in enumerate(item_urls, 1):
-            logger.info(f"🔍 Парсим {i}/{len(item_urls)}: {url}")
-            
-            try:
-                result = self.parser.parse_item_page(url)
-                results[url] = result if result else {'description': None, 'images': []}
-                
-                logger.success(f"✅ Объявление {i} обработано")
-                
-                # Задержка между запросами как в оригинальном парсере (кроме последнего)
-                if i < len(item_urls):
-                    delay = random.uniform(*delay_range)
-                    logger.debug(f"⏳ Пауза {delay:.1f} секунд")
-                    time.sleep(delay)
-                    
-            except Exception as e:
-                logger.error(f"❌ Ошибка парсинга {url}: {e}")
-                results[url] = {'description': None, 'images': []}
+        to_parse = [url for url in item_urls if url not in cached]
+        parsed = self.engine.parse_many(to_parse, pause_range=delay_range) if to_parse else {}
+        for url, result in parsed.items():
+            if result and self.cache:
+                self.cache.put(result, url=url)
+        parsed.update(cached)
+        
+        for url in item_urls:
+            result = parsed.get(url)
+            if result:
+                logger.success(f"✅ Объявление обработано: {url}")
+            else:
+                logger.error(f"❌ Не удалось распарсить {url}")
+            results[url] = result if result else {'description': None, 'images': []}
         
         return results
 
+    def get_selector_stats(self):
+        """Статистика селекторов фото по всем воркерам парсинга"""
+        return self.engine.get_selector_stats()
+
 
 # Глобальный экземпляр адаптера
 _adapter_instance = None
@@ -121,5 +129,10 @@ def parse_item_for_details(item_url):
     Returns:
         dict: {'description': str, 'images': list} или None
     """
-    parser = get_parser()
-    return parser.parse_item_page(item_url)
\ No newline at end of file
+    cache = get_parse_cache() if PARSE_CACHE_ENABLED else None
+    result = cache.get(url=item_url) if cache else None
+    if not result:
+        result = get_parse_engine().submit(item_url).result()
+        if result and cache:
+            cache.put(result, url=item_url)
+    return result
\ No newline at end of file
@@ -1,16 +1,44 @@
 import asyncio
+import json
 import sqlite3
 from datetime import datetime
-import time
-from app.avito.get_all_ads import get_all_user_ads
-from app.parser.parser_description_and_photo import AvitoPageParser
+from app.avito.accounts import DEFAULT_ACCOUNT, load_accounts
+from app.avito.async_client import get_async_api_client
+from app.avito.get_all_ads import AvitoApiError, iter_user_ad_pages_async
+from app.parser.parse_engine import get_parse_engine
 from app.database.database import DatabaseManager
+from app.database.parse_cache import get_parse_cache
 from app.telegram.bot import TelegramBotManager
+from app.config import INCREMENTAL_SYNC, FULL_SYNC_INTERVAL, TIERED_POLLING, POLL_TIERS, PARSE_CACHE_ENABLED
+
+
+# Все статусы объявлений, которые отслеживает монитор
+ALL_STATUSES = "active,removed,old,blocked,rejected"
+
+# Ключи состояния синхронизации в БД
+LAST_SYNC_KEY = "last_sync_at"
+LAST_FULL_SYNC_KEY = "last_full_sync_at"
+LAST_TIER_POLL_KEY = "last_tier_poll_at"
+PROMOTED_IDS_KEY = "promoted_ids"
 
 class AvitoMonitor:
-    def __init__(self):
+    def __init__(self, accounts=None):
+        """
+        Args:
+            accounts (list, optional): Настройки аккаунтов Авито (name, client_id,
+                                       client_secret, chat_id). По умолчанию из config.
+                                       Циклы аккаунтов выполняются параллельно, БД,
+                                       пулы соединений и парсер у них общие.
+        """
         print("🔧 Инициализируем компоненты...")
         
+        try:
+            self.accounts = load_accounts(accounts)
+            print(f"✅ Аккаунты: {', '.join(account.name for account in self.accounts)}")
+        except Exception as e:
+            print(f"❌ Ошибка загрузки аккаунтов: {e}")
+            raise
+        
         try:
             self.db = DatabaseManager()
             print("✅ База данных инициализирована")
@@ -19,14 +47,18 @@ class AvitoMonitor:
             raise
             
         try:
-            self.telegram = TelegramBotManager()
+            self.telegram = {
+                account.name: TelegramBotManager(chat_id=account.chat_id)
+                for account in self.accounts
+            }
             print("✅ Telegram бот инициализирован")
         except Exception as e:
             print(f"❌ Ошибка инициализации Telegram: {e}")
             raise
             
         try:
-            self.parser = AvitoPageParser()
+            self.parse_engine = get_parse_engine()
+            self.parse_cache = get_parse_cache() if PARSE_CACHE_ENABLED else None
             print("✅ Парсер инициализирован")
         except Exception as e:
             print(f"❌ Ошибка инициализации парсера: {e}")
@@ -36,72 +68,221 @@ class AvitoMonitor:
     
     async def run_monitoring_cycle(self):
         """
-        Запускает один полный цикл мониторинга
+        Запускает один полный цикл мониторинга по всем аккаунтам
         Это основная функция, которая координирует всю работу
         """
         print(f"\n🔄 Начинаем цикл мониторинга: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
+        await asyncio.gather(*(self._run_account_cycle(account) for account in self.accounts))
+    
+    async def _run_account_cycle(self, account):
+        """Выполняет цикл мониторинга одного аккаунта"""
+        cycle_started_at = datetime.now()
+        print(f"🔄 [{account.name}] Цикл аккаунта начат")
+        
         try:
-            # 1. Получаем текущие объявления с API Авито
-            print("📡 Получаем данные с API Авито...")
-            current_ads = self._get_current_ads()
-            if not current_ads:
-                print("❌ Не удалось получить данные с API, пропускаем цикл")
-                return
+            # 1. Решаем, какие объявления запрашивать в этом цикле
+            full_sync, queries = self._plan_queries(account, cycle_started_at)
             
-            print(f"📊 Получено {len(current_ads)} объявлений с API")
+            if full_sync:
+                print(f"📡 [{account.name}] Полная сверка: получаем все объявления с API Авито...")
+            elif not queries:
+                print(f"😴 [{account.name}] Ни одну группу статусов не пора опрашивать")
+                return
             
             # 2. Получаем сохраненные объявления из БД
             print("💾 Загружаем данные из базы...")
-            stored_items = self._get_stored_items()
+            stored_items = {item['id']: item for item in self._get_stored_items(account)}
             print(f"💾 В базе данных: {len(stored_items)} объявлений")
             
-            # 3. Сравниваем и выявляем изменения
-            print("🔍 Анализируем изменения...")
-            changes = self._compare_ads(current_ads, stored_items)
+            # 3. Сравниваем и обрабатываем изменения по мере получения страниц,
+            #    пока следующие страницы загружаются в фоне
+            print("🔍 Анализируем изменения по мере получения страниц...")
+            seen_ids = set()
+            totals = {'new_items': 0, 'status_changed': 0, 'removed_items': 0}
+            polled_tiers = set(POLL_TIERS) if full_sync else set()
             
-            # 4. Обрабатываем изменения
-            if any(changes.values()):
-                print("⚡ Обрабатываем изменения...")
-                await self._process_changes(changes, current_ads, stored_items)
+            try:
+                while queries:
+                    tier, statuses, updated_from = queries.pop(0)
+                    if updated_from:
+                        print(f"📡 Инкрементальная синхронизация: объявления, обновленные с {updated_from}...")
+                    elif tier:
+                        print(f"📡 [{account.name}] Статусы {statuses}: полный опрос группы '{tier}'...")
+                    
+                    await self._sync_statuses(account, statuses, updated_from, stored_items, seen_ids, totals)
+                    
+                    if tier:
+                        polled_tiers.add(tier)
+                        queries.extend(self._promote_tiers(account, tier, stored_items, seen_ids, polled_tiers, queries))
+            except AvitoApiError as e:
+                print(f"❌ Не удалось получить данные с API ({e}), прерываем цикл")
+                return
+            
+            print(f"📊 Получено {len(seen_ids)} объявлений с API")
+            
+            # 4. Удаленные из API определяем только по полной выгрузке
+            if full_sync:
+                if not seen_ids:
+                    print("❌ API вернул пустой список при полной сверке, пропускаем цикл")
+                    return
+                
+                removed_items = [item for item_id, item in stored_items.items() if item_id not in seen_ids]
+                if removed_items:
+                    print(f"   Удаленных из API: {len(removed_items)}")
+                    await self._process_changes(account, {'removed_items': removed_items})
+                    totals['removed_items'] += len(removed_items)
+            
+            if any(totals.values()):
+                print(f"⚡ Итого: новых {totals['new_items']}, "
+                      f"изменений статуса {totals['status_changed']}, "
+                      f"удаленных {totals['removed_items']}")
             else:
                 print("😴 Изменений не обнаружено")
             
-            print("✅ Цикл мониторинга завершен успешно")
+            self._mark_synced(account, cycle_started_at, full_sync, polled_tiers)
+            
+            print(f"✅ [{account.name}] Цикл мониторинга завершен успешно")
             
         except Exception as e:
-            print(f"❌ Ошибка в цикле мониторинга: {e}")
+            print(f"❌ [{account.name}] Ошибка в цикле мониторинга: {e}")
             import traceback
             traceback.print_exc()
     
-    def _get_current_ads(self):
-        """Получает текущие объявления с API Авито"""
+    async def _sync_statuses(self, account, statuses, updated_from, stored_items, seen_ids, totals):
+        """
+        Выгружает объявления с указанными статусами и обрабатывает изменения постранично
+        
+        Raises:
+            AvitoApiError: Если не удалось получить одну из страниц
+        """
+        # Продолжаем с контрольной точки только инкрементальную выгрузку: по полной
+        # определяются удаленные объявления, а сдвинувшийся список в устаревших страницах
+        # выдал бы живое объявление за удаленное. Полные выгрузки к тому же не держим в памяти
+        async for page_ads in iter_user_ad_pages_async(status=statuses, updated_from=updated_from,
+                                                       api_client=account.api_client,
+                                                       resume=bool(updated_from)):
+            # Объявление может попасть на две страницы, если список сдвинулся
+            page_ads = [ad for ad in page_ads if ad['id'] not in seen_ids]
+            seen_ids.update(ad['id'] for ad in page_ads)
+            
+            changes = self._compare_ads(page_ads, stored_items)
+            if any(changes.values()):
+                print("⚡ Обрабатываем изменения...")
+                await self._process_changes(account, changes)
+                for key, value in changes.items():
+                    totals[key] += len(value)
+    
+    def _plan_queries(self, account, now):
+        """
+        Определяет, какие выгрузки выполнить в этом цикле
+        
+        Returns:
+            tuple: (full_sync, [(группа или None, статусы, updated_from), ...])
+        """
+        if self._is_full_sync_due(account, now):
+            return True, [(None, ALL_STATUSES, None)]
+        
+        if INCREMENTAL_SYNC:
+            # Инкрементальная выгрузка и так пропорциональна числу изменений - группы не нужны
+            updated_from = self._get_last_sync(account).date().isoformat()
+            return False, [(None, ALL_STATUSES, updated_from)]
+        
+        return False, [
+            (tier, statuses, None)
+            for tier, (statuses, interval) in POLL_TIERS.items()
+            if self._is_tier_due(account, tier, interval, now)
+        ]
+    
+    def _is_tier_due(self, account, tier, interval, now):
+        """Пора ли опрашивать группу статусов"""
+        last_poll = self._get_last_sync(account, f"{LAST_TIER_POLL_KEY}:{tier}")
+        return last_poll is None or (now - last_poll).total_seconds() >= interval
+    
+    def _promote_tiers(self, account, tier, stored_items, seen_ids, polled_tiers, queries):
+        """
+        Если после полного опроса группы часть ее объявлений пропала, они могли перейти
+        в статус другой группы (например, active -> old). Такие группы опрашиваем сразу,
+        не дожидаясь их интервала
+        
+        Удаленное из API объявление остается в БД со старым статусом до полной сверки
+        и пропадает в каждом цикле, поэтому вне очереди опрашиваем только ради
+        объявлений, пропавших впервые
+        """
+        tier_statuses = set(POLL_TIERS[tier][0].split(','))
+        vanished = {
+            item_id for item_id, item in stored_items.items()
+            if item['status'] in tier_statuses and item_id not in seen_ids
+        }
+        
+        promoted_key = self._sync_key(account, f"{PROMOTED_IDS_KEY}:{tier}")
         try:
-            print("🌐 Отправляем запрос к API Авито...")
-            ads = get_all_user_ads(status="active,removed,old,blocked,rejected")
-            
-            if ads is None:
-                print("❌ API вернул None")
-                return None
-            elif len(ads) == 0:
-                print("⚠️ API вернул пустой список")
-                return []
-            else:
-                print(f"✅ API вернул {len(ads)} объявлений")
-                return ads
-                
-        except Exception as e:
-            print(f"❌ Исключение при получении данных с API: {e}")
-            import traceback
-            traceback.print_exc()
+            already_promoted = set(json.loads(self.db.get_sync_state(promoted_key) or '[]'))
+        except ValueError:
+            already_promoted = set()
+        self.db.set_sync_state(promoted_key, json.dumps(sorted(vanished)))
+        
+        newly_vanished = vanished - already_promoted
+        if not newly_vanished:
+            return []
+        
+        queued = {query[0] for query in queries}
+        promoted = [
+            (other, statuses, None)
+            for other, (statuses, interval) in POLL_TIERS.items()
+            if other not in polled_tiers and other not in queued
+        ]
+        if promoted:
+            print(f"🔀 Из группы '{tier}' пропало объявлений: {len(newly_vanished)}, "
+                  f"опрашиваем вне очереди: {', '.join(query[0] for query in promoted)}")
+        return promoted
+    
+    def _sync_key(self, account, key):
+        """Ключ состояния синхронизации аккаунта (у аккаунта по умолчанию - без префикса)"""
+        if account.name == DEFAULT_ACCOUNT:
+            return key
+        return f"{account.name}:{key}"
+    
+    def _get_last_sync(self, account, key=LAST_SYNC_KEY):
+        """Возвращает время последней успешной синхронизации аккаунта или None"""
+        value = self.db.get_sync_state(self._sync_key(account, key))
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            print(f"⚠️ Некорректное значение {key} в БД: {value}")
             return None
     
-    def _get_stored_items(self):
-        """Получает все объявления из базы данных"""
+    def _is_full_sync_due(self, account, now):
+        """Определяет, нужна ли в этом цикле полная сверка со всеми объявлениями"""
+        if not INCREMENTAL_SYNC and not TIERED_POLLING:
+            return True
+        
+        last_sync = self._get_last_sync(account)
+        last_full_sync = self._get_last_sync(account, LAST_FULL_SYNC_KEY)
+        if last_sync is None or last_full_sync is None:
+            return True
+        
+        return (now - last_full_sync).total_seconds() >= FULL_SYNC_INTERVAL
+    
+    def _mark_synced(self, account, synced_at, full_sync, polled_tiers=()):
+        """
+        Запоминает время начала успешного цикла как новую отметку синхронизации
+        Берется начало цикла, чтобы не потерять объявления, измененные во время выгрузки
+        """
+        self.db.set_sync_state(self._sync_key(account, LAST_SYNC_KEY), synced_at.isoformat())
+        if full_sync:
+            self.db.set_sync_state(self._sync_key(account, LAST_FULL_SYNC_KEY), synced_at.isoformat())
+        for tier in polled_tiers:
+            self.db.set_sync_state(self._sync_key(account, f"{LAST_TIER_POLL_KEY}:{tier}"), synced_at.isoformat())
+    
+    def _get_stored_items(self, account):
+        """Получает все объявления аккаунта из базы данных"""
         try:
             with sqlite3.connect(self.db.db_path) as conn:
                 conn.row_factory = sqlite3.Row
-                cursor = conn.execute("SELECT * FROM items")
+                cursor = conn.execute("SELECT * FROM items WHERE account = ?", (account.name,))
                 items = [dict(row) for row in cursor.fetchall()]
                 return items
         except Exception as e:
@@ -110,33 +291,27 @@ class AvitoMonitor:
     
     def _compare_ads(self, current_ads, stored_items):
         """
-        Сравнивает текущие объявления с сохраненными и выявляет изменения
+        Сравнивает полученные с API объявления с сохраненными и выявляет изменения
+        Удаленные из API объявления здесь не определяются: для этого нужна вся выгрузка
+        
+        Args:
+            current_ads (list): Объявления, полученные с API (например, одна страница)
+            stored_items (dict): Объявления из базы данных по ID
         
         Returns:
             dict: Словарь с типами изменений
         """
-        # Создаем множества ID для сравнения
-        current_ids = {ad['id'] for ad in current_ads}
-        stored_ids = {item['id'] for item in stored_items}
-        
-        # Создаем словари для быстрого поиска
-        current_ads_dict = {ad['id']: ad for ad in current_ads}
-        stored_items_dict = {item['id']: item for item in stored_items}
-        
-        # Выявляем изменения
-        new_ids = current_ids - stored_ids
-        removed_ids = stored_ids - current_ids
-        common_ids = current_ids & stored_ids
-        
-        # Проверяем изменения статусов
+        new_items = []
         status_changed = []
-        for item_id in common_ids:
-            stored_item = stored_items_dict[item_id]
-            current_item = current_ads_dict[item_id]
+        
+        for current_item in current_ads:
+            stored_item = stored_items.get(current_item['id'])
             
-            if stored_item['status'] != current_item['status']:
+            if stored_item is None:
+                new_items.append(current_item)
+            elif stored_item['status'] != current_item['status']:
                 status_changed.append({
-                    'id': item_id,
+                    'id': current_item['id'],
                     'old_status': stored_item['status'],
                     'new_status': current_item['status'],
                     'stored_item': stored_item,
@@ -144,63 +319,70 @@ class AvitoMonitor:
                 })
         
         changes = {
-            'new_items': [current_ads_dict[item_id] for item_id in new_ids],
-            'removed_items': [stored_items_dict[item_id] for item_id in removed_ids],
+            'new_items': new_items,
             'status_changed': status_changed
         }
         
         # Логируем найденные изменения
-        print(f"🔍 Результаты анализа:")
-        print(f"   Новых объявлений: {len(changes['new_items'])}")
-        print(f"   Удаленных из API: {len(changes['removed_items'])}")
-        print(f"   Изменений статуса: {len(changes['status_changed'])}")
+        if any(changes.values()):
+            print(f"🔍 Результаты анализа:")
+            print(f"   Новых объявлений: {len(changes['new_items'])}")
+            print(f"   Изменений статуса: {len(changes['status_changed'])}")
         
-        if changes['new_items']:
-            for item in changes['new_items']:
-                print(f"   🆕 Новое: {item['title'][:50]}... (ID: {item['id']})")
+        for item in changes['new_items']:
+            print(f"   🆕 Новое: {item['title'][:50]}... (ID: {item['id']})")
         
         return changes
     
-    async def _process_changes(self, changes, current_ads, stored_items):
-        """Обрабатывает все выявленные изменения"""
+    async def _process_changes(self, account, changes):
+        """Обрабатывает все выявленные изменения аккаунта"""
+        telegram = self.telegram[account.name]
         
-        # 1. Обрабатываем новые объявления
-        for new_item in changes['new_items']:
-            await self._handle_new_item(new_item)
+        # 1. Обрабатываем новые объявления. Страницы всех новых объявлений
+        #    парсятся параллельно воркерами, пока мы отправляем уже готовые
+        new_items = changes.get('new_items', [])
+        details = [asyncio.ensure_future(self._get_item_details(item)) for item in new_items]
+        for new_item, item_details in zip(new_items, details):
+            await self._handle_new_item(account, telegram, new_item, item_details)
             # Добавляем задержку между обработкой объявлений
             await asyncio.sleep(2)
         
         # 2. Обрабатываем изменения статусов
-        for status_change in changes['status_changed']:
-            await self._handle_status_change(status_change)
+        for status_change in changes.get('status_changed', []):
+            await self._handle_status_change(telegram, status_change)
             await asyncio.sleep(1)
         
         # 3. Обрабатываем удаленные объявления
-        for removed_item in changes['removed_items']:
-            await self._handle_removed_item(removed_item)
+        for removed_item in changes.get('removed_items', []):
+            await self._handle_removed_item(telegram, removed_item)
             await asyncio.sleep(1)
     
-    async def _handle_new_item(self, item_data):
-        """Обрабатывает новое объявление"""
+    async def _handle_new_item(self, account, telegram, item_data, item_details=None):
+        """
+        Обрабатывает новое объявление
+        
+        Args:
+            item_details (Awaitable, optional): Уже запущенное получение описания и фото
+        """
         try:
             print(f"🆕 Обрабатываем новое объявление: {item_data['title'][:50]}...")
             
             # Получаем дополнительную информацию (описание и фото)
-            description, images = await self._get_item_details(item_data)
+            description, images = await (item_details or self._get_item_details(item_data))
             
             telegram_result = None
             
             # Отправляем в Telegram только активные объявления
             if item_data['status'] == 'active':
                 print(f"📤 Отправляем в Telegram...")
-                telegram_result = await self.telegram.send_new_item(
+                telegram_result = await telegram.send_new_item(
                     item_data, description, images
                 )
             else:
                 print(f"⏸️ Объявление не активно ({item_data['status']}), не отправляем в Telegram")
             
             # Сохраняем в базу данных
-            self._save_item_to_db(item_data, telegram_result)
+            self._save_item_to_db(account, item_data, telegram_result)
             
             print(f"✅ Новое объявление обработано: ID {item_data['id']}")
             
@@ -209,7 +391,7 @@ class AvitoMonitor:
             import traceback
             traceback.print_exc()
     
-    async def _handle_status_change(self, status_change):
+    async def _handle_status_change(self, telegram, status_change):
         """Обрабатывает изменение статуса объявления"""
         try:
             item_id = status_change['id']
@@ -223,7 +405,7 @@ class AvitoMonitor:
             # Обновляем в Telegram если есть message_id
             if stored_item.get('telegram_message_id'):
                 has_photo = stored_item.get('has_photo', False)
-                success = await self.telegram.edit_item_status(
+                success = await telegram.edit_item_status(
                     stored_item['telegram_message_id'],
                     current_item,
                     new_status,
@@ -241,7 +423,7 @@ class AvitoMonitor:
         except Exception as e:
             print(f"❌ Ошибка обработки изменения статуса: {e}")
     
-    async def _handle_removed_item(self, stored_item):
+    async def _handle_removed_item(self, telegram, stored_item):
         """Обрабатывает объявление, удаленное из API"""
         try:
             item_id = stored_item['id']
@@ -258,7 +440,7 @@ class AvitoMonitor:
                 }
                 
                 has_photo = stored_item.get('has_photo', False)
-                success = await self.telegram.edit_item_status(
+                success = await telegram.edit_item_status(
                     stored_item['telegram_message_id'],
                     item_data,
                     'removed_from_api',
@@ -281,8 +463,21 @@ class AvitoMonitor:
         
         try:
             if item_data.get('url'):
-                print(f"🔍 Парсим страницу: {item_data['url']}")
-                page_data = self.parser.parse_item_page(item_data['url'])
+                page_data = None
+                if self.parse_cache:
+                    page_data = await asyncio.to_thread(
+                        self.parse_cache.get, item_data.get('id'), item_data['url']
+                    )
+                    if page_data:
+                        print(f"📦 Детали взяты из кэша парсинга: ID {item_data.get('id')}")
+                
+                if not page_data:
+                    print(f"🔍 Парсим страницу: {item_data['url']}")
+                    page_data = await self.parse_engine.parse_async(item_data['url'])
+                    if page_data and self.parse_cache:
+                        await asyncio.to_thread(
+                            self.parse_cache.put, page_data, item_data.get('id'), item_data['url']
+                        )
                 
                 if page_data:
                     description = page_data.get('description')
@@ -292,16 +487,13 @@ class AvitoMonitor:
                 else:
                     print(f"❌ Не удалось распарсить страницу")
                 
-                # Задержка между запросами к Авито
-                time.sleep(3)
-                
         except Exception as e:
             print(f"❌ Ошибка парсинга страницы: {e}")
         
         return description, images
     
-    def _save_item_to_db(self, item_data, telegram_result):
-        """Сохраняет новое объявление в базу данных"""
+    def _save_item_to_db(self, account, item_data, telegram_result):
+        """Сохраняет новое объявление аккаунта в базу данных"""
         try:
             telegram_message_id = None
             has_photo = False
@@ -315,8 +507,8 @@ class AvitoMonitor:
             with sqlite3.connect(self.db.db_path) as conn:
                 conn.execute("""
                     INSERT OR REPLACE INTO items 
-                    (id, status, telegram_message_id, is_posted_to_telegram, has_photo, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (id, status, telegram_message_id, is_posted_to_telegram, has_photo, created_at, updated_at, account)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     item_data['id'],
                     item_data['status'],
@@ -324,7 +516,8 @@ class AvitoMonitor:
                     is_posted,
                     has_photo,
                     datetime.now(),
-                    datetime.now()
+                    datetime.now(),
+                    account.name
                 ))
                 
             print(f"💾 Сохранено в БД: ID {item_data['id']}")
@@ -347,6 +540,11 @@ class AvitoMonitor:
         except Exception as e:
             print(f"❌ Ошибка обновления статуса в БД: {e}")
     
+    async def close(self):
+        """Освобождает ресурсы монитора (общую HTTP сессию API и воркеры парсера)"""
+        await get_async_api_client().close()
+        await asyncio.to_thread(self.parse_engine.close)
+    
     def get_monitoring_stats(self):
         """Возвращает статистику мониторинга"""
         try:
@@ -386,6 +584,7 @@ async def test_monitor():
     """Тестирует основную логику мониторинга"""
     print("🧪 Тестируем Monitor...")
     
+    monitor = None
     try:
         monitor = AvitoMonitor()
         
@@ -412,6 +611,9 @@ async def test_monitor():
         print(f"❌ Ошибка при тестировании: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if monitor:
+            await monitor.close()
 
 
 if __name__ == "__main__":
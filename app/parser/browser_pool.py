@@ -0,0 +1,161 @@
+import atexit
+import threading
+from contextlib import contextmanager
+from seleniumbase import SB
+from loguru import logger
+
+from app.config import BROWSER_POOL_SIZE, BROWSER_MAX_PAGES
+
+
+class BrowserSession:
+    """
+    Долгоживущий браузер SeleniumBase
+
+    Контекст SB(...) открывается вручную и закрывается только при
+    утилизации сессии, поэтому запуск Chrome и патчинг undetected
+    драйвера выполняются один раз на много страниц.
+    """
+
+    def __init__(self, options):
+        """
+        Args:
+            options (dict): Параметры запуска SB().
+        """
+        self.options = options
+        self.pages = 0
+        self.retired = False
+        self._context = SB(**options)
+        self.driver = self._context.__enter__()
+
+    def retire(self):
+        """Помечает сессию для закрытия после возврата в пул (ошибка, блокировка)"""
+        self.retired = True
+
+    def close(self):
+        """Закрывает браузер"""
+        try:
+            self._context.__exit__(None, None, None)
+        except Exception as e:
+            logger.debug(f"Ошибка при закрытии браузера: {e}")
+
+
+class BrowserPool:
+    """
+    Пул прогретых браузеров для парсинга страниц
+
+    Держит до size запущенных браузеров и выдает их по одному на
+    страницу. Браузер перезапускается после max_pages страниц или
+    после ошибки/блокировки во время работы с ним. Один пул можно
+    безопасно использовать из нескольких потоков.
+    """
+
+    def __init__(self, launch_options, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 on_close=None):
+        """
+        Args:
+            launch_options (callable): Возвращает параметры SB() для нового браузера.
+                                       Вызывается при каждом запуске, поэтому может,
+                                       например, выбирать случайный user agent.
+            size (int): Максимум одновременно запущенных браузеров.
+            max_pages (int): Через сколько страниц браузер перезапускается.
+            on_close (callable, optional): Вызывается с параметрами запуска после
+                                           закрытия браузера (освобождение профиля).
+        """
+        self.launch_options = launch_options
+        self.on_close = on_close
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+
+        self._idle = []
+        self._total = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+        atexit.register(self.close)
+
+    @contextmanager
+    def session(self):
+        """
+        Выдает браузер из пула на время обработки одной страницы
+
+        Если внутри блока возникло исключение, браузер закрывается,
+        а следующий вызов получит новый. Блок считается одной страницей,
+        если сам не учел страницы в session.pages (несколько вкладок).
+
+        Yields:
+            BrowserSession: Сессия, driver которой готов к работе
+        """
+        session = self._acquire()
+        pages = session.pages
+        try:
+            yield session
+        except Exception:
+            session.retire()
+            raise
+        finally:
+            if session.pages == pages:
+                session.pages += 1
+            self._release(session)
+
+    def close(self):
+        """Закрывает свободные браузеры; занятые закроются при возврате в пул"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._released.notify_all()
+
+        for session in idle:
+            self._close_session(session)
+
+    def get_stats(self):
+        """Возвращает состояние пула для мониторинга"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'running': self._total,
+                'idle': len(self._idle),
+                'max_pages': self.max_pages
+            }
+
+    def _acquire(self):
+        with self._released:
+            self._closed = False  # После close() пул можно использовать снова
+            while not self._idle and self._total >= self.size:
+                self._released.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._total += 1
+
+        options = None
+        try:
+            logger.info("🚀 Запускаем новый браузер для пула")
+            options = self.launch_options()
+            return BrowserSession(options)
+        except Exception:
+            with self._released:
+                self._total -= 1
+                self._released.notify()
+            if options is not None and self.on_close:
+                self.on_close(options)
+            raise
+
+    def _release(self, session):
+        with self._released:
+            recycle = self._closed or session.retired or session.pages >= self.max_pages
+            if recycle:
+                self._total -= 1
+            else:
+                self._idle.append(session)
+            self._released.notify()
+
+        if recycle:
+            if not self._closed and not session.retired:
+                logger.debug(f"♻️ Браузер обработал {session.pages} страниц, перезапускаем")
+            self._close_session(session)
+
+    def _close_session(self, session):
+        session.close()
+        if self.on_close:
+            self.on_close(session.options)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from filelock import FileLock, Timeout
+from loguru import logger
+
+from app.config import PARSER_PROFILES_DIR
+
+
+class BrowserProfiles:
+    """
+    Постоянные профили Chrome для парсера
+
+    Профиль (user_data_dir) хранит cookies, HTTP кэш и local storage
+    между запусками браузера, поэтому Авито видит вернувшегося
+    посетителя, а не нового. Каждый профиль закреплен за прокси и
+    user agent: профили лежат в подкаталоге прокси, а user agent
+    выбирается при создании профиля и дальше не меняется. Одним
+    профилем одновременно пользуется только один браузер, в том числе
+    из разных процессов - занятость отмечается блокировкой lock файла.
+    """
+
+    PROFILE_FILE = 'profile.json'
+    LOCK_FILE = 'in_use.lock'
+
+    def __init__(self, proxy=None, base_dir=PARSER_PROFILES_DIR):
+        """
+        Args:
+            proxy (str, optional): Прокси, за которым закреплены профили.
+            base_dir (str): Каталог профилей.
+        """
+        # В имени каталога хэш, а не сам прокси: в нем логин и пароль
+        proxy_key = hashlib.sha1((proxy or 'direct').encode('utf-8')).hexdigest()[:12]
+        self.directory = os.path.abspath(os.path.join(base_dir, proxy_key))
+        self._lock = threading.Lock()
+        # Занятые этим процессом профили: путь -> захваченный FileLock
+        self._held = {}
+
+    def acquire(self, user_agents):
+        """
+        Занимает свободный профиль или создает новый
+
+        Args:
+            user_agents (list): Из них выбирается user agent нового профиля.
+
+        Returns:
+            dict: {'path': каталог профиля, 'user_agent': закрепленный user agent}
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+
+            existing = sorted((name for name in os.listdir(self.directory) if name.isdigit()), key=int)
+            for name in existing:
+                profile = self._try_lock(os.path.join(self.directory, name))
+                if profile:
+                    return profile
+
+            index = int(existing[-1]) + 1 if existing else 0
+            while True:
+                path = os.path.join(self.directory, str(index))
+                try:
+                    os.makedirs(path)
+                except FileExistsError:
+                    # Профиль только что создал другой процесс
+                    index += 1
+                    continue
+
+                with open(os.path.join(path, self.PROFILE_FILE), 'w', encoding='utf-8') as f:
+                    json.dump({'user_agent': random.choice(user_agents)}, f, ensure_ascii=False)
+
+                profile = self._try_lock(path)
+                if profile:
+                    logger.info(f"🗂️ Создан профиль браузера: {path}")
+                    return profile
+                index += 1
+
+    def release(self, path):
+        """Освобождает профиль после закрытия браузера"""
+        with self._lock:
+            if path in self._held:
+                self._release_locked(path)
+
+    def _try_lock(self, path):
+        """
+        Занимает профиль блокировкой lock файла
+
+        FileLock работает и на Windows, и на Unix. Блокировку снимает сама ОС,
+        когда процесс завершается (в том числе аварийно), поэтому профиль
+        упавшего процесса сразу снова свободен
+        """
+        if path in self._held:
+            return None
+
+        lock = FileLock(os.path.join(path, self.LOCK_FILE), timeout=0)
+        try:
+            lock.acquire()
+        except Timeout:
+            return None
+        self._held[path] = lock
+
+        try:
+            with open(os.path.join(path, self.PROFILE_FILE), 'r', encoding='utf-8') as f:
+                user_agent = json.load(f).get('user_agent')
+        except (OSError, ValueError):
+            # Профиль еще создается другим процессом
+            self._release_locked(path)
+            return None
+
+        return {'path': path, 'user_agent': user_agent}
+
+    def _release_locked(self, path):
+        self._held.pop(path).release()
@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from loguru import logger
+
+from app.config import PARSER_ARCHIVE_DIR, PARSER_ARCHIVE_VERSIONS
+from app.database.parse_cache import item_id_from_url
+from app.parser.http_fetcher import HttpPageFetcher, PAGE_SELECTORS
+
+
+# Первой строкой архивной страницы записывается ее адрес, как при "Сохранить как" в браузере
+SAVED_FROM_RE = re.compile(rb'^<!-- saved from url=(.*?) -->')
+
+# Время загрузки страницы в имени файла архива
+TIME_FORMAT = '%Y%m%d-%H%M%S-%f'
+
+
+class HtmlArchive:
+    """
+    Сжатый архив HTML страниц объявлений
+
+    Каждая разобранная страница сохраняется в gzip файл
+    <каталог>/<ID объявления>/<время загрузки>.html.gz, для объявления
+    хранятся последние versions загрузок. Когда Авито меняет верстку,
+    исправленные селекторы можно применить к архиву командой
+    manage_archive.py без повторного обхода страниц.
+    """
+
+    SUFFIX = '.html.gz'
+
+    def __init__(self, directory=PARSER_ARCHIVE_DIR, versions=PARSER_ARCHIVE_VERSIONS):
+        """
+        Args:
+            directory (str): Каталог архива.
+            versions (int): Сколько последних загрузок страницы хранить.
+
+        Raises:
+            ValueError: Если каталог архива не задан.
+        """
+        if not directory:
+            raise ValueError("Каталог архива не задан (PARSER_ARCHIVE_DIR)")
+        self.directory = os.path.abspath(directory)
+        self.versions = versions
+
+    def save(self, url, html):
+        """
+        Сохраняет страницу в архив
+
+        Args:
+            url (str): URL объявления.
+            html (str | bytes): HTML страницы.
+
+        Returns:
+            str: Путь к файлу архива или None при ошибке
+        """
+        if isinstance(html, str):
+            html = html.encode('utf-8')
+
+        item_dir = os.path.join(self.directory, self._item_key(url))
+        path = os.path.join(item_dir, datetime.now().strftime(TIME_FORMAT) + self.SUFFIX)
+        try:
+            os.makedirs(item_dir, exist_ok=True)
+            # Пишем во временный файл: при параллельном чтении не будет недописанного архива
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(temp_path, 'wb') as f:
+                f.write(f"<!-- saved from url={url} -->\n".encode('utf-8'))
+                f.write(html)
+            os.replace(temp_path, path)
+            self._prune(item_dir)
+            return path
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить страницу в архив: {e}")
+            return None
+
+    def pages(self, latest_only=True):
+        """
+        Перечисляет страницы архива
+
+        Args:
+            latest_only (bool): Только последняя загрузка каждого объявления.
+
+        Returns:
+            list: [{'item': ID или ключ объявления, 'fetched_at': datetime, 'path': str}, ...]
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        pages = []
+        for item in sorted(os.listdir(self.directory)):
+            versions = self._versions(os.path.join(self.directory, item))
+            if latest_only:
+                versions = versions[-1:]
+            for name in versions:
+                pages.append({
+                    'item': int(item) if item.isdigit() else item,
+                    'fetched_at': datetime.strptime(name[:-len(self.SUFFIX)], TIME_FORMAT),
+                    'path': os.path.join(self.directory, item, name)
+                })
+        return pages
+
+    def get_stats(self):
+        """Возвращает размер архива"""
+        pages = self.pages(latest_only=False)
+        size = sum(os.path.getsize(page['path']) for page in pages)
+        return {
+            'directory': self.directory,
+            'items': len({page['item'] for page in pages}),
+            'pages': len(pages),
+            'size_mb': round(size / (1024 * 1024), 2)
+        }
+
+    def _item_key(self, url):
+        item_id = item_id_from_url(url)
+        if item_id is not None:
+            return str(item_id)
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+    def _versions(self, item_dir):
+        try:
+            return sorted(name for name in os.listdir(item_dir) if name.endswith(self.SUFFIX))
+        except OSError:
+            return []
+
+    def _prune(self, item_dir):
+        """Удаляет загрузки страницы сверх versions"""
+        versions = self._versions(item_dir)
+        for name in versions[:max(0, len(versions) - self.versions)]:
+            try:
+                os.remove(os.path.join(item_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def load_page(path):
+    """
+    Читает страницу из архива
+
+    Returns:
+        tuple: (url или None, HTML в байтах)
+    """
+    with gzip.open(path, 'rb') as f:
+        data = f.read()
+    match = SAVED_FROM_RE.match(data)
+    if not match:
+        return None, data
+    return match.group(1).decode('utf-8'), data[match.end():].lstrip(b'\n')
+
+
+# Экстрактор процесса повторного разбора (создается один раз на процесс)
+_extractor = None
+
+def _init_extractor(selectors):
+    global _extractor
+    _extractor = HttpPageFetcher(selectors)
+
+def _extract_page(page):
+    try:
+        url, html = load_page(page['path'])
+        return page, url, _extractor.extract(html, url)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось разобрать {page['path']}: {e}")
+        return page, None, None
+
+
+def reextract_pages(pages, selectors=PAGE_SELECTORS, workers=None):
+    """
+    Заново извлекает описание и фото из архивных страниц на всех ядрах
+
+    Args:
+        pages (list): Страницы из HtmlArchive.pages().
+        selectors (dict): Селекторы парсера.
+        workers (int, optional): Количество процессов (по умолчанию - по числу ядер).
+
+    Yields:
+        tuple: (page, url, {'description': str, 'images': list} или None)
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(pages) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_extractor, initargs=(selectors,)) as executor:
+        yield from executor.map(_extract_page, pages, chunksize=chunksize)
@@ -0,0 +1,155 @@
+import re
+import requests
+from bs4 import BeautifulSoup
+from loguru import logger
+
+from app.avito.client import create_http_session
+from app.config import PARSER_HTTP_TIMEOUT
+from app.database.parse_cache import item_id_from_url
+from app.parser.page_state import find_state_payloads, parse_state_payloads, extract_listing_from_state
+
+
+# Сколько фото объявления сохранять
+MAX_IMAGES = 15
+
+# Селекторы страницы объявления точно как в оригинальном parser_cls
+PAGE_SELECTORS = {
+    'description_full': "[data-marker='item-view/item-description']",
+    'images': [
+        "img[itemprop='image']",
+        ".gallery-img-frame img",
+        ".gallery-extended img",
+        "[data-marker='image-frame/image-wrapper'] img",
+        ".image-frame img",
+        "img[data-marker*='image']"
+    ]
+}
+
+# Атрибуты, в которых могут лежать ссылки на фото (ленивая загрузка), по приоритету
+IMAGE_ATTRIBUTES = ('src', 'data-src', 'data-lazy-src', 'data-original')
+
+
+def normalize_image_urls(sources, limit=MAX_IMAGES, resize=True):
+    """
+    Приводит найденные ссылки на фото к итоговому списку
+
+    Отбрасывает не-http ссылки, для avito.st запрашивает размер
+    1280x960 как в оригинальном парсере (resize=False - для точных
+    ссылок из состояния страницы), убирает дубликаты с сохранением
+    порядка и ограничивает количество.
+    """
+    images = []
+    seen = set()
+    for src in sources:
+        if not src or not src.startswith('http'):
+            continue
+        if resize and 'avito.st' in src:
+            src = re.sub(r'_\d+x\d+', '_1280x960', src)
+        if src not in seen:
+            seen.add(src)
+            images.append(src)
+            if len(images) >= limit:
+                break
+    return images
+
+
+class HttpPageFetcher:
+    """
+    Быстрый путь парсинга: страница объявления обычным HTTP запросом
+
+    Описание и ссылки на фото обычно уже есть в HTML, который отдает
+    сервер, поэтому браузер нужен только при блокировке или если
+    данных в HTML не оказалось. Соединения переиспользуются через
+    общий пул requests.Session.
+    """
+
+    def __init__(self, selectors, proxy=None, timeout=PARSER_HTTP_TIMEOUT, session=None, archive=None):
+        """
+        Args:
+            selectors (dict): Селекторы парсера ('description_full', 'images').
+            proxy (str, optional): Прокси в формате username:password@server:port.
+            timeout (float): Таймаут запроса страницы, сек.
+            session (requests.Session, optional): Сессия с пулом соединений.
+            archive (HtmlArchive, optional): Архив для HTML успешно разобранных страниц.
+        """
+        self.selectors = selectors
+        self.archive = archive
+        self.timeout = timeout
+        self.session = session or create_http_session()
+        self.proxies = {'http': f"http://{proxy}", 'https': f"http://{proxy}"} if proxy else None
+
+    def fetch(self, url, user_agent=None):
+        """
+        Загружает страницу и извлекает описание и фото
+
+        Returns:
+            dict: {'description': str, 'images': list} или None, если страница
+                  заблокирована, не загрузилась или данных в HTML нет
+                  и нужен браузер
+        """
+        headers = {'Accept-Language': 'ru-RU,ru;q=0.9'}
+        if user_agent:
+            headers['User-Agent'] = user_agent
+
+        try:
+            response = self.session.get(url, headers=headers, proxies=self.proxies, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"HTTP загрузка не удалась, нужен браузер: {e}")
+            return None
+
+        if response.status_code in (403, 429):
+            logger.debug(f"HTTP {response.status_code}: доступ ограничен, нужен браузер")
+            return None
+        if response.status_code != 200:
+            logger.debug(f"HTTP {response.status_code}, нужен браузер")
+            return None
+
+        # Отдаем байты: BeautifulSoup сам определит кодировку, даже если сервер ее не указал
+        result = self.extract(response.content, url)
+        if result and self.archive:
+            self.archive.save(url, response.content)
+        return result
+
+    def extract(self, html, url=None):
+        """
+        Извлекает описание и фото из HTML страницы (str или bytes)
+        
+        Встроенное состояние страницы используется, только если в нем
+        есть объявление с ID из url, иначе данные берутся из DOM.
+
+        Returns:
+            dict: {'description': str, 'images': list} или None, если чего-то не хватает
+        """
+        soup = BeautifulSoup(html, "html.parser")
+
+        title = soup.title.get_text() if soup.title else ""
+        if "Доступ ограничен" in title:
+            logger.debug("Доступ ограничен в HTML ответе, нужен браузер")
+            return None
+
+        # Встроенное состояние страницы дает точные ссылки на фото полного размера
+        page_html = html.decode('utf-8', errors='replace') if isinstance(html, bytes) else html
+        state = extract_listing_from_state(
+            parse_state_payloads(*find_state_payloads(page_html)), item_id_from_url(url)
+        ) or {}
+        state_images = normalize_image_urls(state.get('images') or [], resize=False)
+        if state.get('description') and state_images:
+            return {'description': state['description'], 'images': state_images}
+
+        description = state.get('description')
+        description_element = soup.select_one(self.selectors['description_full'])
+        if description_element and not description:
+            description = description_element.get_text("\n", strip=True) or None
+
+        sources = (
+            next((img.get(attribute) for attribute in IMAGE_ATTRIBUTES if img.get(attribute)), None)
+            for img in soup.select(", ".join(self.selectors['images']))
+        )
+        images = state_images or normalize_image_urls(sources)
+
+        if not description or not images:
+            logger.debug(f"В HTML не хватает данных (описание: {bool(description)}, "
+                         f"фото: {len(images)}), нужен браузер")
+            return None
+
+        return {'description': description, 'images': images}
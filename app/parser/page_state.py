@@ -0,0 +1,130 @@
+import html
+import json
+import re
+from urllib.parse import unquote
+from loguru import logger
+
+
+# Состояние страницы Авито: URL-кодированный JSON в window.__initialData__
+# и JSON микрофронтендов в <script data-mfe-state>
+INITIAL_DATA_RE = re.compile(r'window\.__initialData__\s*=\s*"([^"]*)"')
+MFE_STATE_RE = re.compile(r'<script[^>]*\bdata-mfe-state\b[^>]*>(.*?)</script>', re.S)
+
+# Ключ варианта фото вида "1280x960"
+IMAGE_SIZE_RE = re.compile(r'^(\d+)x(\d+)$')
+
+
+def find_state_payloads(page_html):
+    """
+    Находит встроенное состояние в исходном коде страницы
+
+    Returns:
+        tuple: (initial_data, [mfe_state, ...]) - сырые строки, initial_data может быть None
+    """
+    match = INITIAL_DATA_RE.search(page_html)
+    initial_data = match.group(1) if match else None
+    return initial_data, MFE_STATE_RE.findall(page_html)
+
+
+def parse_state_payloads(initial_data=None, mfe_states=()):
+    """
+    Разбирает сырые строки состояния в JSON объекты
+
+    Args:
+        initial_data (str, optional): Значение window.__initialData__ (URL-кодированный JSON).
+        mfe_states (list): Содержимое тегов <script data-mfe-state>.
+
+    Returns:
+        list: Разобранные объекты состояния (некорректные пропускаются)
+    """
+    states = []
+    payloads = []
+    if initial_data:
+        payloads.append(unquote(initial_data))
+    payloads.extend(state for state in mfe_states if state and state.strip())
+
+    for payload in payloads:
+        # В HTML ответе JSON микрофронтенда может быть экранирован HTML сущностями
+        for candidate in (payload, html.unescape(payload)):
+            try:
+                states.append(json.loads(candidate))
+                break
+            except ValueError as e:
+                error = e
+        else:
+            logger.debug(f"Не удалось разобрать состояние страницы: {error}")
+    return states
+
+
+def extract_listing_from_state(states, item_id):
+    """
+    Ищет в состоянии страницы объявление с описанием и фото
+
+    В состоянии кроме самого объявления есть рекомендации, похожие
+    объявления и SEO описания, поэтому берется только объект с полем
+    id, равным ID объявления страницы, и с описанием и/или списком
+    images, где каждое фото - словарь {"640x480": url, "1280x960": url, ...}.
+    Из вариантов фото берется самый крупный.
+
+    Args:
+        states (list): Разобранные объекты состояния.
+        item_id (int): ID объявления страницы (без него состояние не используется).
+
+    Returns:
+        dict: {'description': str или None, 'images': list} или None, если объявление не найдено
+    """
+    if item_id is None:
+        return None
+
+    best = None
+    for node in _iter_dicts(states):
+        if str(node.get('id')) != str(item_id):
+            continue
+
+        description = node.get('description')
+        if not isinstance(description, str) or not description.strip():
+            description = None
+
+        images = _largest_variants(node.get('images'))
+        if not description and not images:
+            continue
+
+        candidate = {'description': description.strip() if description else None, 'images': images}
+        if best is None or _completeness(candidate) > _completeness(best):
+            best = candidate
+
+    return best
+
+
+def _iter_dicts(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def _largest_variants(images):
+    """Для каждого фото возвращает ссылку на самый крупный вариант"""
+    if not isinstance(images, list):
+        return []
+
+    urls = []
+    for image in images:
+        if not isinstance(image, dict):
+            continue
+        sizes = []
+        for key, url in image.items():
+            match = IMAGE_SIZE_RE.match(str(key))
+            if match and isinstance(url, str) and url.startswith('http'):
+                sizes.append((int(match.group(1)) * int(match.group(2)), url))
+        if sizes:
+            urls.append(max(sizes)[1])
+    return urls
+
+
+def _completeness(candidate):
+    return (bool(candidate['description']) + bool(candidate['images']), len(candidate['images']))
@@ -0,0 +1,454 @@
+import asyncio
+import atexit
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from loguru import logger
+
+from app.config import (
+    PARSE_WORKERS, PARSE_MAX_DEFERRALS, PARSE_WORKER_MAX_RESTARTS, PARSER_TABS, PROXY_SERVERS, PROXY_ENABLED
+)
+
+
+# Сколько секунд ждать сообщения 'taken' от живых воркеров, прежде чем считать
+# задачу, которой нет ни в очереди, ни у воркеров, потерянной упавшим воркером
+ORPHAN_GRACE = 5
+
+# Максимальная пауза перед перезапуском воркера, который падает при запуске, сек
+MAX_RESTART_DELAY = 60
+
+
+def _worker_main(worker_id, proxies, tasks, results, max_deferrals=PARSE_MAX_DEFERRALS, tabs=PARSER_TABS):
+    """
+    Цикл процесса-воркера: свой браузер, прокси и user agent
+
+    Берет задачи (task_id, url, pause_range) из общей очереди и
+    возвращает (task_id, {'description', 'images'} или None).
+    Задача None останавливает воркер. Сообщения подписаны (worker_id, pid),
+    чтобы движок отличал перезапущенный воркер от упавшего.
+
+    Вместо пауз после блокировок и ошибок парсер откладывает задачу:
+    воркер запоминает, когда ее можно повторить, и тем временем
+    обрабатывает следующие URL из очереди.
+
+    При tabs > 1 воркер забирает из очереди до tabs задач без пауз
+    и загружает их одновременно во вкладках своего браузера.
+    """
+    from app.parser.parser_description_and_photo import AvitoPageParser, ParseDeferred
+
+    sender = (worker_id, os.getpid())
+
+    parser = AvitoPageParser(proxies=proxies)
+    # User agent закреплен за воркером, чтобы отпечаток браузера не менялся между страницами
+    parser.user_agents = [parser.user_agents[worker_id % len(parser.user_agents)]]
+
+    # Отложенные задачи: (не раньше, task_id, url, pause_range, сколько раз отложена)
+    deferred = []
+    # Сколько страниц учтено в статистике селекторов на момент последней отправки
+    selector_pages = [0]
+
+    def report_selector_stats():
+        # Статистика живет в процессе воркера - отправляем снимок, когда она изменилась
+        if parser.selector_stats.pages != selector_pages[0]:
+            selector_pages[0] = parser.selector_stats.pages
+            results.put(('selectors', sender, None, parser.get_selector_stats()))
+
+    def parse(task_id, url, pause_range, deferrals):
+        try:
+            result = parser.parse_item_page(url, defer=deferrals < max_deferrals)
+        except ParseDeferred as e:
+            logger.info(f"⏳ Воркер {worker_id}: {url} отложен на {e.delay:.0f} сек, берем следующие")
+            heapq.heappush(deferred, (time.monotonic() + e.delay, task_id, url, pause_range, deferrals + 1))
+            return
+        except Exception as e:
+            logger.error(f"❌ Воркер {worker_id}: ошибка парсинга {url}: {e}")
+            result = None
+        report_selector_stats()
+        results.put(('done', sender, task_id, result))
+
+        if pause_range:
+            time.sleep(random.uniform(*pause_range))
+
+    def parse_in_tabs(batch):
+        task_ids = {}
+        for task_id, url, _ in batch:
+            task_ids.setdefault(url, []).append(task_id)
+
+        retry = []
+        try:
+            for url, result in parser.parse_item_pages(list(task_ids), tabs=tabs):
+                report_selector_stats()
+                for task_id in task_ids.pop(url, []):
+                    if result:
+                        results.put(('done', sender, task_id, result))
+                    else:
+                        retry.append((task_id, url))
+        except Exception as e:
+            logger.error(f"❌ Воркер {worker_id}: ошибка парсинга во вкладках: {e}")
+
+        # Не полученные во вкладках страницы - обычным парсингом, когда браузер освободился
+        retry.extend((task_id, url) for url, ids in task_ids.items() for task_id in ids)
+        for task_id, url in retry:
+            parse(task_id, url, None, 0)
+
+    stopping = False
+    try:
+        while not stopping:
+            if deferred and deferred[0][0] <= time.monotonic():
+                _, task_id, url, pause_range, deferrals = heapq.heappop(deferred)
+                results.put(('taken', sender, task_id))
+                parse(task_id, url, pause_range, deferrals)
+                continue
+
+            try:
+                timeout = max(0.0, deferred[0][0] - time.monotonic()) if deferred else None
+                task = tasks.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if task is None:
+                break
+
+            # Задачи без пауз загружаем вместе во вкладках одного браузера
+            batch = [task]
+            while tabs > 1 and not task[2] and len(batch) < tabs:
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is None:
+                    stopping = True
+                    break
+                if task[2]:
+                    # Задача с паузами - по одной, как обычно
+                    tasks.put(task)
+                    break
+                batch.append(task)
+
+            for task_id, _, _ in batch:
+                results.put(('taken', sender, task_id))
+            if len(batch) > 1:
+                parse_in_tabs(batch)
+            else:
+                task_id, url, pause_range = batch[0]
+                parse(task_id, url, pause_range, 0)
+    finally:
+        parser.close()
+
+
+class ParseEngine:
+    """
+    Параллельный парсинг страниц объявлений в нескольких процессах
+
+    Каждый воркер - отдельный процесс со своим браузером, пулом прокси
+    и user agent. Воркеры начинают с разных прокси, а при блокировке
+    переключаются на самый здоровый из оставшихся. URL раздаются через общую очередь, результаты
+    возвращаются как concurrent.futures.Future. Упавший воркер
+    перезапускается, а его текущая и отложенные задачи завершаются
+    с результатом None - в том числе задачи, о получении которых он
+    не успел сообщить. Воркер, который падает при запуске, перезапускается
+    с растущей паузой, а после PARSE_WORKER_MAX_RESTARTS попыток подряд
+    больше не запускается; когда не остается ни одного воркера, все
+    задачи завершаются с результатом None.
+    """
+
+    def __init__(self, workers=PARSE_WORKERS, proxies=None):
+        """
+        Args:
+            workers (int): Количество процессов-воркеров.
+            proxies (list, optional): Прокси воркеров. По умолчанию PROXY_SERVERS,
+                                      если прокси включены.
+        """
+        self.workers = max(1, workers)
+        if proxies is None:
+            proxies = PROXY_SERVERS if PROXY_ENABLED else []
+        self.proxies = list(proxies)
+
+        self._context = multiprocessing.get_context('spawn')
+        self._tasks = None
+        self._results = None
+        self._processes = {}
+        self._in_flight = {}
+        self._futures = {}
+        self._selector_stats = {}
+        # Падения воркеров подряд без единого сообщения и время их перезапуска
+        self._failures = {}
+        self._respawn_at = {}
+        # Задачи, которые мог забрать упавший воркер: task_id -> когда проверить
+        self._orphans = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+        self._running = False
+
+    def start(self):
+        """Запускает воркеры (повторный вызов ничего не делает)"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._tasks = self._context.Queue()
+            self._results = self._context.Queue()
+            for worker_id in range(self.workers):
+                self._spawn(worker_id)
+
+        self._collector = threading.Thread(target=self._collect, name="parse-engine-collector", daemon=True)
+        self._collector.start()
+        atexit.register(self.close)
+        logger.info(f"🔧 Движок парсинга запущен: воркеров {self.workers}, прокси {len(self.proxies)}")
+
+    def submit(self, url, pause_range=None):
+        """
+        Ставит URL в очередь парсинга
+
+        Args:
+            url (str): URL страницы объявления.
+            pause_range (tuple, optional): Пауза воркера после страницы, сек (от, до).
+
+        Returns:
+            Future: Результат parse_item_page: {'description': str, 'images': list} или None
+        """
+        self.start()
+        future = Future()
+        task_id = next(self._task_ids)
+        with self._lock:
+            if not self._processes and not self._respawn_at:
+                logger.error(f"❌ Нет работающих воркеров парсинга, {url} не обработан")
+                future.set_result(None)
+                return future
+            self._futures[task_id] = future
+            # Под блокировкой: задача из _futures уже в очереди, когда ее ищет _mark_orphans()
+            self._tasks.put((task_id, url, pause_range))
+        return future
+
+    async def parse_async(self, url):
+        """Асинхронно парсит страницу, не блокируя event loop"""
+        return await asyncio.wrap_future(self.submit(url))
+
+    def parse_many(self, urls, pause_range=None):
+        """
+        Парсит несколько страниц параллельно всеми воркерами
+
+        Returns:
+            dict: {url: {'description': str, 'images': list} или None}
+        """
+        futures = {url: self.submit(url, pause_range) for url in dict.fromkeys(urls)}
+        return {url: future.result() for url, future in futures.items()}
+
+    def get_selector_stats(self):
+        """
+        Статистика селекторов фото по всем воркерам
+
+        Returns:
+            dict: {селектор: {'checks', 'hit_rate', 'avg_images'}} - сумма проверок
+                  и средние, взвешенные по проверкам и срабатываниям
+        """
+        with self._lock:
+            snapshots = list(self._selector_stats.values())
+
+        totals = {}
+        for snapshot in snapshots:
+            for selector, stats in snapshot.items():
+                total = totals.setdefault(selector, {'checks': 0, 'hits': 0.0, 'images': 0.0})
+                hits = stats['hit_rate'] * stats['checks']
+                total['checks'] += stats['checks']
+                total['hits'] += hits
+                total['images'] += stats['avg_images'] * hits
+
+        return {
+            selector: {
+                'checks': total['checks'],
+                'hit_rate': round(total['hits'] / total['checks'], 2) if total['checks'] else 0.0,
+                'avg_images': round(total['images'] / total['hits'], 1) if total['hits'] else 0.0
+            }
+            for selector, total in totals.items()
+        }
+
+    def close(self, timeout=10):
+        """Останавливает воркеры; незавершенные задачи получают результат None"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            processes = list(self._processes.values())
+
+        for _ in processes:
+            self._tasks.put(None)
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+        if self._collector is not None:
+            self._collector.join(timeout)
+
+        with self._lock:
+            futures, self._futures = self._futures, {}
+            self._processes = {}
+            self._in_flight = {}
+            self._respawn_at = {}
+            self._orphans = {}
+        for future in futures.values():
+            if not future.done():
+                future.set_result(None)
+
+    def _spawn(self, worker_id):
+        # Сдвигаем список, чтобы при равном здоровье воркеры начинали с разных прокси
+        shift = worker_id % len(self.proxies) if self.proxies else 0
+        proxies = self.proxies[shift:] + self.proxies[:shift]
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, proxies, self._tasks, self._results),
+            name=f"parse-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def _collect(self):
+        """Разбирает результаты воркеров и следит, чтобы они не падали молча"""
+        while self._running or self._futures:
+            self._check_workers()
+            try:
+                message = self._results.get(timeout=1)
+            except queue.Empty:
+                if not self._running:
+                    return
+                continue
+
+            kind, (worker_id, pid), task_id = message[:3]
+            with self._lock:
+                process = self._processes.get(worker_id)
+                current = process is not None and process.pid == pid
+                if current:
+                    # Воркер запустился и работает - счет падений при запуске сначала
+                    self._failures.pop(worker_id, None)
+
+                if kind == 'selectors':
+                    self._selector_stats[worker_id] = message[3]
+                    continue
+
+                # Задача числится за воркером и пока отложена - до сообщения 'done'
+                if kind == 'taken':
+                    if current:
+                        self._in_flight.setdefault(worker_id, set()).add(task_id)
+                    elif task_id in self._futures:
+                        # Задачу забрал уже упавший воркер: ждем его 'done', если он успел его отправить
+                        self._orphans.setdefault(task_id, time.monotonic() + ORPHAN_GRACE)
+                    continue
+                if current:
+                    self._in_flight.get(worker_id, set()).discard(task_id)
+                future = self._futures.pop(task_id, None)
+
+            if future is not None and not future.done():
+                future.set_result(message[3])
+
+    def _check_workers(self):
+        with self._lock:
+            if not self._running:
+                return
+            now = time.monotonic()
+            dead = [worker_id for worker_id, process in self._processes.items() if not process.is_alive()]
+            lost = []
+            for worker_id in dead:
+                del self._processes[worker_id]
+                for task_id in self._in_flight.pop(worker_id, set()):
+                    lost.append(self._futures.pop(task_id, None))
+
+                failures = self._failures.get(worker_id, 0) + 1
+                self._failures[worker_id] = failures
+                if failures > PARSE_WORKER_MAX_RESTARTS:
+                    logger.error(
+                        f"❌ Воркер парсинга {worker_id} упал {failures} раз подряд, не успев начать работу, "
+                        f"больше не перезапускаем"
+                    )
+                    continue
+                delay = min(MAX_RESTART_DELAY, 2 ** (failures - 1))
+                logger.warning(f"⚠️ Воркер парсинга {worker_id} завершился, перезапуск через {delay} сек")
+                self._respawn_at[worker_id] = now + delay
+
+            if dead:
+                self._mark_orphans(now)
+
+            for worker_id, respawn_at in list(self._respawn_at.items()):
+                if respawn_at <= now:
+                    del self._respawn_at[worker_id]
+                    self._spawn(worker_id)
+
+            lost.extend(self._sweep_orphans(now))
+
+            if not self._processes and not self._respawn_at and self._futures:
+                logger.error(f"❌ Не осталось работающих воркеров парсинга, задач без результата: {len(self._futures)}")
+                self._drain_tasks()
+                lost.extend(self._futures.values())
+                self._futures = {}
+                self._orphans = {}
+
+        for future in lost:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    def _drain_tasks(self):
+        """Забирает все задачи из очереди (вызывается под self._lock)"""
+        drained = []
+        while True:
+            try:
+                # С таймаутом: только что поставленные задачи могут быть еще не в канале очереди
+                drained.append(self._tasks.get(timeout=0.1))
+            except queue.Empty:
+                return drained
+
+    def _queued_task_ids(self):
+        """ID задач в очереди; порядок очереди сохраняется (вызывается под self._lock)"""
+        drained = self._drain_tasks()
+        for task in drained:
+            self._tasks.put(task)
+        return {task[0] for task in drained}
+
+    def _owned_task_ids(self):
+        return set().union(*self._in_flight.values())
+
+    def _mark_orphans(self, now):
+        """
+        Запоминает задачи, которые мог забрать упавший воркер
+
+        Воркер может упасть, забрав задачу из очереди, но не успев сообщить
+        'taken'. Такой задачи нет ни в очереди, ни у живых воркеров; если
+        за ORPHAN_GRACE секунд ее не заберет живой воркер, она потеряна.
+        """
+        candidates = self._futures.keys() - self._owned_task_ids() - self._queued_task_ids()
+        for task_id in candidates:
+            self._orphans.setdefault(task_id, now + ORPHAN_GRACE)
+
+    def _sweep_orphans(self, now):
+        """Возвращает Future потерянных задач (вызывается под self._lock)"""
+        expired = [task_id for task_id, deadline in self._orphans.items() if deadline <= now]
+        if not expired:
+            return []
+
+        owned = self._owned_task_ids()
+        # Воркер мог вернуть задачу в очередь (задачу с паузами при загрузке во вкладках)
+        queued = self._queued_task_ids()
+        lost = []
+        for task_id in expired:
+            del self._orphans[task_id]
+            if task_id in self._futures and task_id not in owned and task_id not in queued:
+                logger.warning(f"⚠️ Задача парсинга {task_id} потеряна упавшим воркером")
+                lost.append(self._futures.pop(task_id))
+        return lost
+
+
+# Единственный движок парсинга для всего приложения
+_engine = None
+
+def get_parse_engine():
+    """Получить единственный экземпляр движка парсинга"""
+    global _engine
+    if _engine is None:
+        _engine = ParseEngine()
+    return _engine
@@ -1,16 +1,49 @@
+import copy
 import os
 import random
+import threading
 import time
-import re
 from selenium.webdriver.common.by import By
-from seleniumbase import SB
 from loguru import logger
 import sys
 
 # Добавляем корневую директорию в путь
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from app.config import PROXY_SERVER, PROXY_ENABLED
+from app.config import (
+    PROXY_SERVERS, PROXY_ENABLED, PARSER_READY_TIMEOUT, PARSER_MAX_HUMAN_DELAY, PARSER_HTTP_FAST_PATH,
+    PARSER_BLOCK_RESOURCES, PARSER_PROFILES_DIR, PARSER_RELOADS, PARSER_ARCHIVE_DIR, PARSER_TABS
+)
+from app.database.parse_cache import item_id_from_url
+from app.parser.browser_pool import BrowserPool
+from app.parser.browser_profiles import BrowserProfiles
+from app.parser.html_archive import HtmlArchive
+from app.parser.http_fetcher import HttpPageFetcher, PAGE_SELECTORS, IMAGE_ATTRIBUTES, MAX_IMAGES, normalize_image_urls
+from app.parser.page_state import parse_state_payloads, extract_listing_from_state
+from app.parser.proxy_pool import ProxyPool
+from app.parser.selector_stats import SelectorStats
+
+
+# Ресурсы, которые не нужны для извлечения описания и ссылок на фото
+BLOCKED_URL_PATTERNS = [
+    # Картинки и видео: ссылки на фото остаются в DOM и состоянии страницы
+    "*img.avito.st*", "*.jpg*", "*.jpeg*", "*.png*", "*.webp*", "*.gif*", "*.svg*", "*.ico*",
+    "*.mp4*", "*.webm*",
+    # Шрифты
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    # Реклама и аналитика
+    "*mc.yandex.ru*", "*an.yandex.ru*", "*yandex.ru/ads*", "*ads.adfox.ru*", "*googletagmanager.com*",
+    "*google-analytics.com*", "*doubleclick.net*", "*top-fwz1.mail.ru*", "*vk.com/rtrg*",
+]
+
+
+class ParseDeferred(Exception):
+    """Парсинг страницы нужно повторить не раньше чем через delay секунд"""
+    
+    def __init__(self, delay, reason):
+        super().__init__(f"{reason}, повтор через {delay:.0f} сек")
+        self.delay = delay
+        self.reason = reason
 
 
 class AvitoPageParser:
@@ -19,37 +52,50 @@ class AvitoPageParser:
     Основан на проверенном parser_cls.py
     """
     
-    def __init__(self, proxy=None, debug_mode=False):
+    def __init__(self, proxy=None, debug_mode=False, http_fast_path=PARSER_HTTP_FAST_PATH,
+                 block_resources=PARSER_BLOCK_RESOURCES, proxies=None):
         """
         Инициализация парсера
         
         Args:
             proxy (str): Прокси в формате username:password@server:port или None для использования из config
             debug_mode (bool): Показывать браузер для отладки
+            http_fast_path (bool): Сначала пробовать получить страницу без браузера
+            block_resources (bool): Не загружать картинки, видео, шрифты и трекеры
+            proxies (list, optional): Несколько прокси вместо одного proxy
         """
-        # Используем прокси из config если не передан явно
-        if proxy is None and PROXY_ENABLED:
-            self.proxy = PROXY_SERVER
-        else:
-            self.proxy = proxy
+        # Используем прокси из config если не переданы явно
+        if proxies is None:
+            if proxy is not None:
+                proxies = [proxy] if proxy else []
+            elif PROXY_ENABLED:
+                proxies = PROXY_SERVERS
+            else:
+                proxies = []
+        self.proxy_pool = ProxyPool(proxies)
             
         self.debug_mode = debug_mode
+        self.http_fast_path = http_fast_path
+        self.block_resources = block_resources
         self.user_agents = self._load_user_agents()
         
         # Селекторы точно как в оригинальном parser_cls
-        self.selectors = {
-            'description_full': "[data-marker='item-view/item-description']",
-            'images': [
-                "img[itemprop='image']",
-                ".gallery-img-frame img",
-                ".gallery-extended img", 
-                "[data-marker='image-frame/image-wrapper'] img",
-                ".image-frame img",
-                "img[data-marker*='image']"
-            ]
-        }
+        self.selectors = copy.deepcopy(PAGE_SELECTORS)
+        
+        # Полезность селекторов фото: порядок проверки и ранняя остановка
+        self.selector_stats = SelectorStats(self.selectors['images'])
+        
+        # HTML разобранных страниц для повторного извлечения после смены верстки
+        self.archive = HtmlArchive() if PARSER_ARCHIVE_DIR else None
         
-        logger.info(f"🔧 Парсер инициализирован. Прокси: {'Включен' if self.proxy else 'Отключен'}")
+        # Браузеры, профили и HTTP клиент для каждого прокси создаются при первом использовании
+        self._routes = {}
+        self._routes_lock = threading.Lock()
+        # Прокси, через который парсер работает сейчас (сначала - первый из списка)
+        self._current_proxy = self.proxy_pool.proxies[0]
+        
+        proxies_count = len([proxy for proxy in self.proxy_pool.proxies if proxy])
+        logger.info(f"🔧 Парсер инициализирован. Прокси: {f'Включен ({proxies_count})' if proxies_count else 'Отключен'}")
     
     def _load_user_agents(self):
         """Загружает user agents как в оригинальном парсере"""
@@ -78,25 +124,96 @@ class AvitoPageParser:
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         ]
     
-    def ip_block_handler(self):
-        """Обработка блокировки IP как в оригинальном парсере"""
-        logger.warning("⛔ Обнаружена блокировка IP")
-        if self.proxy:
-            logger.info("🔄 Пауза из-за блокировки, прокси активен")
-            time.sleep(random.uniform(30, 60))
-        else:
-            logger.info("🔄 Блок IP. Прокси нет, увеличенная пауза")
-            time.sleep(random.uniform(300, 350))
+    def _route(self, proxy):
+        """
+        Возвращает браузеры, профили и HTTP клиент прокси
+        
+        Живой браузер держится только у текущего прокси: при смене прокси
+        браузеры прежнего закрываются, чтобы у воркера был один Chrome
+        """
+        with self._routes_lock:
+            route = self._routes.get(proxy)
+            if route is None:
+                route = _ProxyRoute(self, proxy)
+                self._routes[proxy] = route
+            previous = self._routes.get(self._current_proxy) if proxy != self._current_proxy else None
+            self._current_proxy = proxy
+        
+        if previous:
+            previous.browser_pool.close()
+        return route
+    
+    def _launch_options(self, route):
+        """Параметры запуска браузера точно как в оригинальном parser_cls"""
+        options = dict(
+            uc=True,  # Обход детекции
+            headed=True if self.debug_mode else False,
+            headless2=True if not self.debug_mode else False,
+            page_load_strategy="eager",
+            block_images=self.block_resources,  # Нужны ссылки на фото, а не сами картинки
+            agent=random.choice(self.user_agents),
+            proxy=route.proxy if route.proxy else None,
+            sjw=False,  # Стабильность важнее скорости для парсинга фото
+        )
+        
+        if route.profiles:
+            profile = route.profiles.acquire(self.user_agents)
+            options['user_data_dir'] = profile['path']
+            options['agent'] = profile['user_agent'] or options['agent']
+        
+        return options
+    
+    def _block_resources(self, driver):
+        """
+        Запрещает браузеру загружать тяжелые и лишние ресурсы через CDP
+        
+        Вызывается перед каждым переходом: после переподключения
+        undetected драйвера настройки CDP могут сброситься
+        """
+        if not self.block_resources:
+            return
+        try:
+            driver.driver.execute_cdp_cmd("Network.enable", {})
+            driver.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logger.debug(f"Не удалось включить блокировку ресурсов: {e}")
+    
+    def get_selector_stats(self):
+        """Возвращает долю срабатываний и среднее число фото селекторов фото"""
+        return self.selector_stats.get_stats()
+    
+    def close(self):
+        """Закрывает браузеры всех прокси"""
+        with self._routes_lock:
+            routes = list(self._routes.values())
+        for route in routes:
+            route.browser_pool.close()
+    
+    def ip_block_handler(self, wait):
+        """
+        Обработка блокировки IP: все прокси в карантине, ждем, пока освободится первый
+        
+        Пока есть хоть один здоровый прокси, парсер просто переключается
+        на него и не ждет
+        """
+        logger.warning("⛔ Все прокси заблокированы" if any(self.proxy_pool.proxies) else "⛔ Блок IP, прокси нет")
+        logger.info(f"🔄 Пауза {wait:.0f} секунд до окончания карантина")
+        time.sleep(wait)
     
-    def parse_item_page(self, url):
+    def parse_item_page(self, url, defer=False):
         """
         Парсит страницу объявления и возвращает только фото и описание
         
         Args:
             url (str): URL страницы объявления
+            defer (bool): Не ждать после блокировок и ошибок, а выбросить
+                          ParseDeferred, чтобы вызывающий код повторил позже
             
         Returns:
             dict: {'description': str, 'images': list} или None
+            
+        Raises:
+            ParseDeferred: Только при defer=True, если перед повтором нужна пауза
         """
         if not url:
             logger.error("URL не предоставлен")
@@ -105,136 +222,566 @@ class AvitoPageParser:
         logger.info(f"🔍 Парсим страницу: {url}")
         
         max_retries = 2
+        proxy, wait = self.proxy_pool.acquire(prefer=self._current_proxy)
         
         for attempt in range(max_retries + 1):
-            try:
-                # Настройки браузера точно как в оригинальном parser_cls
-                with SB(uc=True,  # Обход детекции
-                        headed=True if self.debug_mode else False,
-                        headless2=True if not self.debug_mode else False,
-                        page_load_strategy="eager",
-                        block_images=False,  # НЕ блокируем изображения - они нам нужны
-                        agent=random.choice(self.user_agents),
-                        proxy=self.proxy if self.proxy else None,
-                        sjw=False,  # Стабильность важнее скорости для парсинга фото
-                        ) as driver:
-                    
-                    # Переходим на страницу
-                    driver.get(url)
-                    
-                    # Проверяем на блокировку точно как в оригинале
-                    if "Доступ ограничен" in driver.get_title():
-                        logger.warning(f"⛔ Доступ ограничен (попытка {attempt + 1})")
-                        if attempt < max_retries:
-                            self.ip_block_handler()
-                            continue
-                        else:
-                            return None
-                    
-                    # Ждем загрузки контента как в оригинальном парсере
-                    try:
-                        # Используем тот же селектор что и в parser_cls для проверки загрузки
-                        driver.wait_for_element("[data-marker='item-view/total-views']", timeout=10)
-                    except Exception:
-                        # Дополнительная проверка на блокировку
-                        if "Доступ ограничен" in driver.get_title():
-                            logger.warning("⛔ Блокировка обнаружена при ожидании загрузки")
-                            if attempt < max_retries:
-                                self.ip_block_handler()
-                                continue
-                            else:
-                                return None
-                        logger.debug("Не дождался полной загрузки страницы")
-                    
-                    # Прокручиваем страницу для загрузки всех изображений
-                    # Имитируем человеческое поведение как в оригинале
-                    try:
-                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/3);")
-                        time.sleep(random.uniform(1, 2))
-                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-                        time.sleep(random.uniform(1, 2))
-                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                        time.sleep(random.uniform(1, 2))
-                        driver.execute_script("window.scrollTo(0, 0);")
-                        time.sleep(random.uniform(1, 2))
-                    except Exception:
-                        pass
-                    
-                    # Извлекаем данные
-                    result = self._extract_page_data(driver)
-                    
-                    # Задержка перед закрытием браузера как в оригинале
-                    time.sleep(random.uniform(2, 4))
-                    
+            if wait > 0:
+                if defer:
+                    raise ParseDeferred(wait, "Все прокси в карантине")
+                self.ip_block_handler(wait)
+            route = self._route(proxy)
+            started = time.monotonic()
+            
+            # Быстрый путь без браузера: описание и фото обычно уже есть в HTML
+            if attempt == 0 and route.http_fetcher:
+                result = route.http_fetcher.fetch(url, user_agent=random.choice(self.user_agents))
+                if result:
+                    self.proxy_pool.report_success(proxy, time.monotonic() - started)
+                    logger.success(f"⚡ Страница получена без браузера: описание {len(result['description'])} символов, "
+                                   f"фото {len(result['images'])}")
                     return result
-                    
+            
+            try:
+                # Берем прогретый браузер из пула вместо запуска нового
+                with route.browser_pool.session() as session:
+                    outcome, result = self._parse_in_session(session, url)
             except Exception as e:
+                # Браузер не пережил ошибку - пул запустит новый (последний уровень восстановления)
                 logger.error(f"❌ Ошибка парсинга (попытка {attempt + 1}): {e}")
+                self.proxy_pool.report_failure(proxy)
                 if attempt < max_retries:
                     delay = random.uniform(10, 15)
+                    if defer:
+                        raise ParseDeferred(delay, f"Ошибка парсинга: {e}")
                     logger.info(f"⏳ Пауза {delay:.1f} секунд перед повторной попыткой")
                     time.sleep(delay)
+                    proxy, wait = self.proxy_pool.acquire(prefer=proxy)
                     continue
                 else:
                     logger.error("❌ Все попытки исчерпаны")
                     return None
+            
+            if outcome == 'ok':
+                self.proxy_pool.report_success(proxy, time.monotonic() - started)
+                
+                # Пауза перед следующей страницей как в оригинале, но не дольше PARSER_MAX_HUMAN_DELAY
+                self._human_pause(2, 4)
+                
+                return result
+            
+            if outcome == 'blocked':
+                logger.warning(f"⛔ Доступ ограничен (попытка {attempt + 1})")
+                route.browser_pool.close()
+                self.proxy_pool.report_block(proxy)
+            else:
+                logger.warning(f"⚠️ Страница не загрузилась и после перезагрузки (попытка {attempt + 1})")
+                self.proxy_pool.report_failure(proxy)
+            
+            if attempt < max_retries:
+                # Следующая попытка - через другой прокси, если есть здоровый
+                proxy, wait = self.proxy_pool.acquire(exclude=proxy)
+                continue
+            
+            logger.error("❌ Все попытки исчерпаны")
+            return None
         
         return None
     
-    def _extract_page_data(self, driver):
-        """Извлекает только описание и изображения"""
+    def _parse_in_session(self, session, url, reloads=PARSER_RELOADS):
+        """
+        Загружает и разбирает страницу в одной живой сессии браузера
+        
+        Восстановление без перезапуска: если данные не найдены, страница
+        опрашивается повторно, затем перезагружается (до reloads раз).
+        Заблокированная или умершая сессия помечается для закрытия.
+        
+        Returns:
+            tuple: ('ok', result), ('blocked', None) или ('failed', None)
+        """
+        driver = session.driver
+        
+        for step in range(reloads + 1):
+            try:
+                self._block_resources(driver)
+                if step == 0:
+                    # Переходим на страницу
+                    driver.get(url)
+                else:
+                    logger.info(f"🔁 Перезагружаем страницу в той же сессии ({step}/{reloads})")
+                    driver.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка загрузки страницы: {e}")
+                if not self._is_alive(driver):
+                    session.retire()
+                    return 'failed', None
+                continue
+            
+            # Проверяем на блокировку точно как в оригинале
+            if self._is_blocked(driver):
+                session.retire()
+                return 'blocked', None
+            
+            # Ждем, пока появятся описание и фото галереи, а не фиксированное время
+            ready = self._wait_until_ready(driver, url)
+            if not ready:
+                # Дополнительная проверка на блокировку
+                if self._is_blocked(driver):
+                    session.retire()
+                    return 'blocked', None
+                logger.debug("Не дождался полной загрузки страницы")
+            
+            # Извлекаем данные; если пусто - еще раз опрашиваем уже загруженную страницу
+            result = self._extract_page_data(driver, url)
+            if not result['description'] and not result['images']:
+                self._human_pause(0.5, 1)
+                result = self._extract_page_data(driver, url)
+            
+            if result['description'] or result['images'] or ready:
+                # Пустой результат у полностью загруженной страницы - описания и фото
+                # у объявления просто нет (или сменилась верстка - страница будет в архиве)
+                self._archive_page(url, driver)
+                return 'ok', result
+        
+        return 'failed', None
+    
+    def parse_item_pages(self, urls, tabs=PARSER_TABS):
+        """
+        Парсит несколько страниц одновременно во вкладках одного браузера
+        
+        Страницы без блокировок и ошибок разбираются за один проход:
+        сначала быстрым путем без браузера, остальные - в tabs вкладках,
+        которые грузятся параллельно и опрашиваются по кругу. Страницы,
+        которые так получить не удалось, нужно разобрать через
+        parse_item_page() - с повторами и сменой прокси.
+        
+        Args:
+            urls (list): URL страниц объявлений
+            tabs (int): Сколько вкладок загружать одновременно
+            
+        Yields:
+            tuple: (url, {'description': str, 'images': list}) по мере готовности
+                   или (url, None), если страницу нужно разобрать через parse_item_page()
+        """
+        pending = list(dict.fromkeys(url for url in urls if url))
+        proxy, wait = self.proxy_pool.acquire(prefer=self._current_proxy)
+        if wait > 0:
+            # Все прокси в карантине: ожиданием и повторами займется parse_item_page()
+            for url in pending:
+                yield url, None
+            return
+        route = self._route(proxy)
+        
+        # Быстрый путь без браузера: описание и фото обычно уже есть в HTML
+        if route.http_fetcher:
+            remaining = []
+            for url in pending:
+                started = time.monotonic()
+                result = route.http_fetcher.fetch(url, user_agent=random.choice(self.user_agents))
+                if result:
+                    self.proxy_pool.report_success(proxy, time.monotonic() - started)
+                    yield url, result
+                else:
+                    remaining.append(url)
+            pending = remaining
+        
+        if not pending:
+            return
+        
+        logger.info(f"🗂️ Парсим {len(pending)} страниц в {min(tabs, len(pending))} вкладках")
+        try:
+            with route.browser_pool.session() as session:
+                for url, outcome, result, latency in self._parse_tabs_in_session(session, pending, tabs):
+                    pending.remove(url)
+                    if outcome == 'ok':
+                        self.proxy_pool.report_success(proxy, latency)
+                        yield url, result
+                        continue
+                    if outcome == 'blocked':
+                        logger.warning(f"⛔ Доступ ограничен во вкладке: {url}")
+                        self.proxy_pool.report_block(proxy)
+                    else:
+                        self.proxy_pool.report_failure(proxy)
+                    yield url, None
+        except Exception as e:
+            logger.error(f"❌ Ошибка парсинга во вкладках: {e}")
+            self.proxy_pool.report_failure(proxy)
+        
+        for url in pending:
+            yield url, None
+    
+    def _parse_tabs_in_session(self, session, urls, tabs, timeout=PARSER_READY_TIMEOUT):
+        """
+        Загружает страницы в нескольких вкладках сессии и разбирает их по мере готовности
+        
+        Переход во вкладке запускается без ожидания загрузки, после чего
+        вкладки по кругу опрашиваются _check_ready. Готовая (или не
+        дождавшаяся за timeout) вкладка разбирается и закрывается, а на
+        ее место открывается следующая страница. После блокировки разбор
+        прекращается, а сессия помечается для закрытия.
+        
+        Yields:
+            tuple: (url, 'ok' | 'blocked' | 'failed', result, сек от начала загрузки)
+        """
+        driver = session.driver
+        webdriver = driver.driver
+        main_window = webdriver.current_window_handle
+        queued = list(urls)
+        opened = {}
+        
+        try:
+            while queued or opened:
+                while queued and len(opened) < tabs:
+                    url = queued.pop(0)
+                    webdriver.switch_to.new_window('tab')
+                    # Блокировка ресурсов через CDP действует только на свою вкладку
+                    self._block_resources(driver)
+                    driver.execute_script("window.location.href = arguments[0];", url)
+                    opened[webdriver.current_window_handle] = {
+                        'url': url,
+                        'started': time.monotonic(),
+                        'progress': {}
+                    }
+                
+                for handle, tab in list(opened.items()):
+                    webdriver.switch_to.window(handle)
+                    ready = self._check_ready(driver, tab['url'], tab['progress'])
+                    if not ready and time.monotonic() - tab['started'] < timeout:
+                        continue
+                    
+                    del opened[handle]
+                    if self._is_blocked(driver):
+                        # Остальные вкладки идут через тот же прокси - их страницы разберет parse_item_page()
+                        webdriver.close()
+                        webdriver.switch_to.window(main_window)
+                        session.retire()
+                        yield tab['url'], 'blocked', None, None
+                        return
+                    
+                    result = self._extract_page_data(driver, tab['url'])
+                    if result['description'] or result['images'] or ready:
+                        self._archive_page(tab['url'], driver)
+                        outcome = 'ok'
+                    else:
+                        outcome = 'failed'
+                    webdriver.close()
+                    # Закрытая вкладка больше не текущая - новая вкладка из нее не откроется
+                    webdriver.switch_to.window(main_window)
+                    session.pages += 1
+                    yield tab['url'], outcome, result, time.monotonic() - tab['started']
+                
+                time.sleep(0.1)
+        finally:
+            # Незавершенные вкладки закрываем, чтобы сессия вернулась в пул с одной вкладкой
+            for handle in opened:
+                try:
+                    webdriver.switch_to.window(handle)
+                    webdriver.close()
+                except Exception:
+                    session.retire()
+            try:
+                webdriver.switch_to.window(main_window)
+            except Exception:
+                session.retire()
+    
+    def _archive_page(self, url, driver):
+        """Сохраняет отрисованную страницу в архив, если он включен"""
+        if not self.archive:
+            return
+        try:
+            self.archive.save(url, driver.get_page_source())
+        except Exception as e:
+            logger.debug(f"Не удалось получить HTML страницы для архива: {e}")
+    
+    def _is_blocked(self, driver):
+        return "Доступ ограничен" in driver.get_title()
+    
+    def _is_alive(self, driver):
+        """Отвечает ли браузер после ошибки"""
+        try:
+            driver.get_title()
+            return True
+        except Exception:
+            return False
+    
+    def _wait_until_ready(self, driver, url, timeout=PARSER_READY_TIMEOUT, idle_time=0.5):
+        """
+        Ждет готовности страницы: во встроенном состоянии страницы уже есть
+        это объявление, или описание и хотя бы одно фото галереи уже в DOM, или страница
+        загружена и новые ресурсы не грузятся idle_time секунд
+        (объявления без фото или описания)
+        
+        Returns:
+            bool: True, если страница готова, False - если истек timeout
+        """
+        deadline = time.monotonic() + timeout
+        progress = {}
+        
+        while time.monotonic() < deadline:
+            if self._check_ready(driver, url, progress, idle_time):
+                return True
+            time.sleep(0.1)
+        
+        return False
+    
+    def _check_ready(self, driver, url, progress, idle_time=0.5):
+        """
+        Один опрос готовности страницы для _wait_until_ready и вкладок
+        
+        Args:
+            url (str): URL объявления (по ID из него ищется объявление в состоянии страницы)
+            progress (dict): Состояние опроса страницы между вызовами (изначально пустой)
+        
+        Returns:
+            bool: True, если страница готова
+        """
+        item_id = item_id_from_url(url)
+        try:
+            state = driver.execute_script(
+                _READINESS_SCRIPT,
+                self.selectors['description_full'],
+                ", ".join(self.selectors['images']),
+                str(item_id) if item_id is not None else None
+            )
+        except Exception as e:
+            logger.debug(f"Не удалось проверить готовность страницы: {e}")
+            return False
+        
+        # Во вкладке переход на страницу еще не начался
+        if not state or state.get('url') == 'about:blank':
+            return False
+        
+        if state['description'] and state['images']:
+            return True
+        
+        # ID объявления встречается в состоянии страницы: если в нем уже есть само объявление
+        # с данными, галерею ждать не нужно (разбираем состояние не чаще раза в секунду)
+        now = time.monotonic()
+        if state['pageState'] and now - progress.get('state_checked_at', 0) >= 1:
+            progress['state_checked_at'] = now
+            if self._read_listing_state(driver, item_id):
+                return True
+        
+        if state['complete'] and state['resources'] == progress.get('resources'):
+            if now - progress['idle_since'] >= idle_time:
+                logger.debug("Сеть затихла, но описание или фото не найдены")
+                return True
+        else:
+            progress['resources'] = state['resources']
+            progress['idle_since'] = now
+        
+        # Ленивая галерея: один раз прокручиваем страницу, чтобы она начала грузиться
+        if state['complete'] and not state['images'] and not progress.get('scrolled'):
+            try:
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+            except Exception as e:
+                # Страница еще переходит - прокрутим при следующем опросе
+                logger.debug(f"Не удалось прокрутить страницу: {e}")
+                return False
+            self._human_pause(0.3, 1)
+            progress['scrolled'] = True
+        
+        return False
+    
+    def _human_pause(self, low, high):
+        """Случайная пауза как у человека, ограниченная PARSER_MAX_HUMAN_DELAY"""
+        delay = min(random.uniform(low, high), PARSER_MAX_HUMAN_DELAY)
+        if delay > 0:
+            time.sleep(delay)
+    
+    def _read_listing_state(self, driver, item_id):
+        """Объявление из встроенного состояния страницы или None"""
+        try:
+            data = driver.execute_script(_STATE_SCRIPT) or {}
+        except Exception as e:
+            logger.debug(f"Не удалось прочитать состояние страницы: {e}")
+            return None
+        return extract_listing_from_state(
+            parse_state_payloads(data.get('initialData'), data.get('mfeStates') or []), item_id
+        )
+    
+    def _extract_page_data(self, driver, url):
+        """
+        Извлекает только описание и изображения за один вызов execute_script
+        
+        Данные берутся из объявления с ID из url во встроенном состоянии
+        страницы, а при его отсутствии - из DOM по селекторам
+        """
         result = {
             'description': None,
             'images': []
         }
         
-        # Извлекаем полное описание
+        # Селекторы фото - от самых полезных, с остановкой на полной галерее
+        selectors, enough = self.selector_stats.plan(MAX_IMAGES)
         try:
-            description_elements = driver.find_elements(self.selectors['description_full'], by="css selector")
-            if description_elements:
-                description = description_elements[0].text.strip()
-                if description:
-                    result['description'] = description
-                    logger.success(f"📄 Описание найдено: {len(description)} символов")
-                else:
-                    logger.warning("📄 Описание пустое")
-            else:
-                logger.warning("📄 Элемент описания не найден")
+            data = driver.execute_script(
+                _EXTRACT_SCRIPT,
+                self.selectors['description_full'],
+                selectors,
+                list(IMAGE_ATTRIBUTES),
+                enough
+            ) or {}
         except Exception as e:
-            logger.error(f"❌ Ошибка извлечения описания: {e}")
+            logger.error(f"❌ Ошибка извлечения данных страницы: {e}")
+            return result
         
-        # Извлекаем все изображения
-        images = []
-        try:
-            for selector in self.selectors['images']:
-                try:
-                    img_elements = driver.find_elements(selector, by="css selector")
-                    for img in img_elements:
-                        # Проверяем разные атрибуты изображений
-                        src = (img.get_attribute('src') or 
-                              img.get_attribute('data-src') or 
-                              img.get_attribute('data-lazy-src') or
-                              img.get_attribute('data-original'))
-                        
-                        if src and src.startswith('http') and src not in images:
-                            # Улучшаем качество изображений avito.st как в оригинале
-                            if 'avito.st' in src:
-                                src = re.sub(r'_\d+x\d+', '_1280x960', src)
-                            images.append(src)
-                except Exception as e:
-                    logger.debug(f"Ошибка с селектором {selector}: {e}")
-                    continue
-            
-            # Убираем дубликаты и ограничиваем количество
-            result['images'] = list(dict.fromkeys(images))[:15]  # Максимум 15 фото
-            logger.success(f"🖼️ Найдено изображений: {len(result['images'])}")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка извлечения изображений: {e}")
+        counts = dict(zip(selectors, data.get('counts') or []))
+        self.selector_stats.record(counts)
+        logger.debug(f"Селекторы фото: проверено {len(counts)} из {len(selectors)}, найдено {counts}")
+        if self.selector_stats.pages % 100 == 0:
+            logger.info(f"📊 Селекторы фото за последние страницы: {self.selector_stats.get_stats()}")
+        
+        # Сначала встроенное состояние страницы: точные ссылки на фото полного размера
+        state = extract_listing_from_state(
+            parse_state_payloads(data.get('initialData'), data.get('mfeStates') or []), item_id_from_url(url)
+        ) or {}
+        if state:
+            logger.debug(f"Состояние страницы: описание {bool(state['description'])}, фото {len(state['images'])}")
+        
+        # Полное описание (из DOM, если в состоянии его нет)
+        description = state.get('description') or data.get('description')
+        if description is None:
+            logger.warning("📄 Элемент описания не найден")
+        elif description.strip():
+            result['description'] = description.strip()
+            logger.success(f"📄 Описание найдено: {len(result['description'])} символов")
+        else:
+            logger.warning("📄 Описание пустое")
+        
+        # Все изображения: из состояния как есть, из DOM - улучшаем качество avito.st;
+        # убираем дубликаты, максимум 15 фото
+        result['images'] = (normalize_image_urls(state.get('images') or [], resize=False)
+                            or normalize_image_urls(data.get('images') or []))
+        logger.success(f"🖼️ Найдено изображений: {len(result['images'])}")
+        
+        if result['description'] and len(counts) == len(selectors) and not any(counts.values()):
+            # Страница с описанием, но ни один селектор фото не сработал - похоже на смену верстки
+            logger.warning(f"⚠️ Ни один селектор фото не нашел изображений: {self.selector_stats.get_stats()}")
         
         return result
 
 
+class _ProxyRoute:
+    """Браузеры, постоянные профили и HTTP клиент одного прокси"""
+    
+    def __init__(self, parser, proxy):
+        self.proxy = proxy
+        # Постоянные профили закреплены за прокси и user agent, чтобы сайт видел вернувшегося посетителя
+        self.profiles = BrowserProfiles(proxy) if PARSER_PROFILES_DIR else None
+        # Браузеры переиспользуются между страницами и перезапускаются
+        # после BROWSER_MAX_PAGES страниц или при ошибке
+        self.browser_pool = BrowserPool(lambda: parser._launch_options(self), on_close=self._release_profile)
+        self.http_fetcher = (HttpPageFetcher(parser.selectors, proxy=proxy, archive=parser.archive)
+                             if parser.http_fast_path else None)
+    
+    def _release_profile(self, options):
+        """Освобождает профиль закрытого браузера"""
+        if self.profiles and options.get('user_data_dir'):
+            self.profiles.release(options['user_data_dir'])
+
+
+# Состояние страницы для _check_ready за один вызов execute_script
+_READINESS_SCRIPT = """
+var description = document.querySelector(arguments[0]);
+var images = document.querySelectorAll(arguments[1]);
+var withSource = 0;
+for (var i = 0; i < images.length; i++) {
+    var img = images[i];
+    if (img.getAttribute('src') || img.getAttribute('data-src') ||
+            img.getAttribute('data-lazy-src') || img.getAttribute('data-original')) {
+        withSource++;
+    }
+}
+// Есть ли ID объявления во встроенном состоянии (само объявление проверяется в Python)
+var itemId = arguments[2];
+var pageState = false;
+if (itemId) {
+    var initialData = window.__initialData__;
+    if (initialData && typeof initialData !== 'string') {
+        try { initialData = JSON.stringify(initialData); } catch (e) { initialData = null; }
+    }
+    pageState = !!(initialData && initialData.indexOf(itemId) !== -1);
+    var stateScripts = document.querySelectorAll('script[data-mfe-state]');
+    for (var n = 0; n < stateScripts.length && !pageState; n++) {
+        pageState = stateScripts[n].textContent.indexOf(itemId) !== -1;
+    }
+}
+return {
+    pageState: pageState,
+    description: !!(description && description.textContent.trim()),
+    images: withSource,
+    complete: document.readyState === 'complete',
+    resources: performance.getEntriesByType('resource').length,
+    url: location.href
+};
+"""
+
+
+# Встроенное состояние страницы: window.__initialData__ и JSON микрофронтендов
+_STATE_SCRIPT = """
+var initialData = window.__initialData__;
+if (initialData && typeof initialData !== 'string') {
+    initialData = encodeURIComponent(JSON.stringify(initialData));
+}
+var mfeStates = [];
+var stateScripts = document.querySelectorAll('script[data-mfe-state]');
+for (var n = 0; n < stateScripts.length; n++) {
+    mfeStates.push(stateScripts[n].textContent);
+}
+return {initialData: initialData || null, mfeStates: mfeStates};
+"""
+
+
+# Описание, ссылки на все фото и встроенное состояние страницы одним JSON:
+# для каждого img в порядке селекторов берется первый непустой атрибут из IMAGE_ATTRIBUTES,
+# селекторы проверяются, пока один из них не найдет достаточно фото (enough)
+_EXTRACT_SCRIPT = """
+var description = document.querySelector(arguments[0]);
+var selectors = arguments[1];
+var attributes = arguments[2];
+var enough = arguments[3];
+var images = [];
+var counts = [];
+for (var i = 0; i < selectors.length; i++) {
+    var elements = document.querySelectorAll(selectors[i]);
+    var found = 0;
+    for (var j = 0; j < elements.length; j++) {
+        for (var k = 0; k < attributes.length; k++) {
+            var src = elements[j].getAttribute(attributes[k]);
+            if (src) {
+                // Абсолютная ссылка, как возвращает get_attribute
+                try { src = new URL(src, document.baseURI).href; } catch (e) {}
+                images.push(src);
+                found++;
+                break;
+            }
+        }
+    }
+    counts.push(found);
+    // Галерея уже полная - остальные селекторы обычно находят не больше
+    if (enough[i] !== null && found >= enough[i]) {
+        break;
+    }
+}
+var initialData = window.__initialData__;
+if (initialData && typeof initialData !== 'string') {
+    initialData = encodeURIComponent(JSON.stringify(initialData));
+}
+var mfeStates = [];
+var stateScripts = document.querySelectorAll('script[data-mfe-state]');
+for (var n = 0; n < stateScripts.length; n++) {
+    mfeStates.push(stateScripts[n].textContent);
+}
+return {
+    description: description ? description.innerText : null,
+    images: images,
+    counts: counts,
+    initialData: initialData || null,
+    mfeStates: mfeStates
+};
+"""
+
+
 # Единственный экземпляр парсера для всего приложения (как в оригинале)
 _parser_instance = None
 
@@ -258,20 +805,24 @@ def parse_avito_photos_and_description(url, proxy=None, debug=False):
     Returns:
         dict: {'description': str, 'images': list} или None
     """
+    parser = None
     try:
         parser = AvitoPageParser(proxy=proxy, debug_mode=debug)
         return parser.parse_item_page(url)
     except Exception as e:
         logger.error(f"❌ Ошибка парсинга: {e}")
         return None
+    finally:
+        if parser is not None:
+            parser.close()
 
 
 def test_parser():
     """Тестирует парсер с вашими настройками"""
     logger.info("🧪 Тестируем адаптированный парсер...")
     
-    # Ваш прокси из конфига
-    proxy = PROXY_SERVER if PROXY_ENABLED else None
+    # Ваши прокси из конфига
+    proxies = PROXY_SERVERS if PROXY_ENABLED else []
     
     # Тестовые URL
     test_urls = [
@@ -279,12 +830,12 @@ def test_parser():
         "https://www.avito.ru/moskva/kvartiry/1-k._kvartira_32_m_35_et._2011149284"
     ]
     
+    # Создаем парсер: браузер запустится один раз на все тесты
+    parser = AvitoPageParser(proxies=proxies, debug_mode=True)  # True для просмотра браузера
+    
     for i, test_url in enumerate(test_urls, 1):
         logger.info(f"\n📄 Тест {i}: {test_url}")
-        logger.info(f"🔧 Используемый прокси: {proxy}")
-        
-        # Создаем парсер
-        parser = AvitoPageParser(proxy=proxy, debug_mode=True)  # True для просмотра браузера
+        logger.info(f"🔧 Здоровье прокси: {parser.proxy_pool.get_stats()}")
         
         # Парсим
         result = parser.parse_item_page(test_url)
@@ -312,6 +863,8 @@ def test_parser():
         if i < len(test_urls):
             logger.info("⏳ Пауза 10 секунд между тестами...")
             time.sleep(10)
+    
+    parser.close()
 
 
 if __name__ == "__main__":
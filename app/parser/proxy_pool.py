@@ -0,0 +1,143 @@
+import threading
+import time
+from loguru import logger
+
+from app.config import PROXY_COOLDOWN, PROXY_MAX_COOLDOWN
+
+
+class ProxyPool:
+    """
+    Пул прокси парсера с оценкой здоровья
+
+    Для каждого прокси считает успехи, блокировки, ошибки и среднюю
+    задержку и на каждый парсинг выдает самый здоровый из доступных.
+    Заблокированный прокси уходит в карантин, который удваивается при
+    каждой блокировке подряд (от cooldown до max_cooldown сек) и
+    сбрасывается после успеха. Прокси None - прямое подключение.
+    """
+
+    # Текущий прокси меняется на лучший, только если его оценка ниже этой доли от лучшей
+    SWITCH_RATIO = 0.5
+
+    def __init__(self, proxies, cooldown=PROXY_COOLDOWN, max_cooldown=PROXY_MAX_COOLDOWN):
+        """
+        Args:
+            proxies (list): Прокси в формате username:password@server:port. Пустой
+                            список - работа без прокси.
+            cooldown (float): Карантин после первой блокировки, сек.
+            max_cooldown (float): Максимальный карантин, сек.
+        """
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._stats = {
+            proxy: {
+                'successes': 0,
+                'blocks': 0,
+                'failures': 0,
+                'latency': None,
+                'strikes': 0,
+                'quarantined_until': 0.0,
+                'last_used': 0.0
+            }
+            for proxy in (list(dict.fromkeys(proxies)) or [None])
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def proxies(self):
+        return list(self._stats)
+
+    def acquire(self, exclude=None, prefer=None):
+        """
+        Выбирает прокси для следующего парсинга
+
+        Args:
+            exclude (str, optional): Прокси, который выбирать только если
+                                     других доступных нет (смена прокси).
+            prefer (str, optional): Текущий прокси вызывающего: остается, пока он не
+                                    в карантине и не заметно хуже лучшего (смена прокси
+                                    означает новый браузер и потерю профиля).
+
+        Returns:
+            tuple: (proxy, wait) - лучший доступный прокси и 0, а если все в
+                   карантине - прокси, который освободится раньше всех, и
+                   сколько секунд до этого осталось
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = [proxy for proxy, stats in self._stats.items() if stats['quarantined_until'] <= now]
+            if len(available) > 1 and exclude in available:
+                available.remove(exclude)
+            if not available:
+                proxy = min(self._stats, key=lambda p: self._stats[p]['quarantined_until'])
+                return proxy, self._stats[proxy]['quarantined_until'] - now
+
+            # При равном здоровье - тот, что дольше не использовался
+            proxy = max(available, key=lambda p: (self._score(p), -self._stats[p]['last_used']))
+            if prefer in available and self._score(prefer) >= self._score(proxy) * self.SWITCH_RATIO:
+                proxy = prefer
+            self._stats[proxy]['last_used'] = now
+            return proxy, 0.0
+
+    def report_success(self, proxy, latency=None):
+        """Успешный парсинг через прокси"""
+        with self._lock:
+            stats = self._stats.get(proxy)
+            if stats is None:
+                return
+            stats['successes'] += 1
+            stats['strikes'] = 0
+            if latency is not None:
+                # Экспоненциальное скользящее среднее задержки
+                stats['latency'] = latency if stats['latency'] is None else 0.8 * stats['latency'] + 0.2 * latency
+
+    def report_block(self, proxy):
+        """Прокси получил блокировку: отправляем в карантин"""
+        with self._lock:
+            stats = self._stats.get(proxy)
+            if stats is None:
+                return
+            stats['blocks'] += 1
+            stats['strikes'] += 1
+            pause = min(self.max_cooldown, self.cooldown * 2 ** (stats['strikes'] - 1))
+            stats['quarantined_until'] = time.monotonic() + pause
+
+        logger.warning(f"🚫 Прокси {_mask(proxy)} заблокирован, карантин {pause:.0f} сек")
+
+    def report_failure(self, proxy):
+        """Ошибка загрузки через прокси (не блокировка): снижает оценку"""
+        with self._lock:
+            stats = self._stats.get(proxy)
+            if stats is not None:
+                stats['failures'] += 1
+
+    def get_stats(self):
+        """Возвращает здоровье прокси для мониторинга (логины и пароли скрыты)"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                _mask(proxy): {
+                    'successes': stats['successes'],
+                    'blocks': stats['blocks'],
+                    'failures': stats['failures'],
+                    'latency': stats['latency'],
+                    'score': self._score(proxy),
+                    'quarantined_for': max(0.0, stats['quarantined_until'] - now)
+                }
+                for proxy, stats in self._stats.items()
+            }
+
+    def _score(self, proxy):
+        """Доля успехов (со сглаживанием для новых прокси), поделенная на штраф за задержку"""
+        stats = self._stats[proxy]
+        attempts = stats['successes'] + stats['blocks'] + stats['failures']
+        success_rate = (stats['successes'] + 1) / (attempts + 2)
+        latency = stats['latency'] or 0.0
+        return success_rate / (1 + latency / 10)
+
+
+def _mask(proxy):
+    """Прокси без логина и пароля для логов"""
+    if proxy is None:
+        return 'direct'
+    return proxy.rsplit('@', 1)[-1]
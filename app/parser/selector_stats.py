@@ -0,0 +1,94 @@
+import threading
+from collections import deque
+
+
+class SelectorStats:
+    """
+    Статистика селекторов фото в скользящем окне
+
+    Для каждого селектора хранит результаты последних window страниц,
+    на которых он проверялся: нашел ли он фото и сколько. По этой
+    статистике селекторы проверяются от самых полезных к бесполезным,
+    а проверка останавливается, когда ни один из оставшихся селекторов
+    обычно не находит больше фото, чем уже найдено. Каждую
+    explore_every страницу проверяются все селекторы, чтобы статистика
+    редко срабатывающих не устаревала и смена верстки была видна сразу.
+    """
+
+    def __init__(self, selectors, window=50, explore_every=20):
+        """
+        Args:
+            selectors (list): Селекторы в исходном порядке (он же порядок при равной полезности).
+            window (int): Сколько последних проверок каждого селектора учитывать.
+            explore_every (int): Раз в сколько страниц проверять все селекторы.
+        """
+        self.selectors = list(selectors)
+        self.explore_every = explore_every
+        self.pages = 0
+        self._history = {selector: deque(maxlen=window) for selector in self.selectors}
+        self._lock = threading.Lock()
+
+    def plan(self, limit):
+        """
+        Порядок проверки селекторов для следующей страницы
+
+        Args:
+            limit (int): Больше скольких фото искать не нужно.
+
+        Returns:
+            tuple: (selectors, enough) - селекторы по убыванию полезности и для
+                   каждого, сколько фото достаточно найти им, чтобы не проверять
+                   остальные (None - проверять все)
+        """
+        with self._lock:
+            explore = self.pages % self.explore_every == 0
+            self.pages += 1
+            ranked = sorted(
+                self.selectors,
+                key=lambda selector: (self._hit_rate(selector), self._yield(selector)),
+                reverse=True
+            )
+            if explore:
+                return ranked, [None] * len(ranked)
+
+            # Селектору достаточно найти столько фото, сколько обычно находит лучший из оставшихся
+            enough = []
+            for index in range(len(ranked)):
+                rest = [self._yield(selector) for selector in ranked[index + 1:]]
+                enough.append(max(1, min(limit, max(rest, default=0))))
+            return ranked, enough
+
+    def record(self, counts):
+        """
+        Учитывает результат страницы
+
+        Args:
+            counts (dict): {селектор: сколько фото найдено} для проверенных селекторов.
+        """
+        with self._lock:
+            for selector, count in counts.items():
+                if selector in self._history:
+                    self._history[selector].append(count)
+
+    def get_stats(self):
+        """Возвращает долю срабатываний и среднее число фото каждого селектора"""
+        with self._lock:
+            return {
+                selector: {
+                    'checks': len(self._history[selector]),
+                    'hit_rate': round(self._hit_rate(selector), 2),
+                    'avg_images': round(self._yield(selector), 1)
+                }
+                for selector in self.selectors
+            }
+
+    def _hit_rate(self, selector):
+        history = self._history[selector]
+        if not history:
+            # Еще не проверялся - считаем полезным, чтобы проверить
+            return 1.0
+        return sum(1 for count in history if count) / len(history)
+
+    def _yield(self, selector):
+        hits = [count for count in self._history[selector] if count]
+        return sum(hits) / len(hits) if hits else 0.0
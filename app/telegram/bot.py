@@ -4,9 +4,13 @@ from app.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
 
 class TelegramBotManager:
-    def __init__(self):
+    def __init__(self, chat_id=None):
+        """
+        Args:
+            chat_id (str, optional): Чат для сообщений. По умолчанию CHAT_ID из config
+        """
         self.bot_token = TELEGRAM_BOT_TOKEN
-        self.chat_id = TELEGRAM_CHAT_ID
+        self.chat_id = chat_id or TELEGRAM_CHAT_ID
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
     
     async def send_new_item(self, item_data, description=None, images=None):
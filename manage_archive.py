@@ -0,0 +1,64 @@
+from app.config import PARSER_ARCHIVE_DIR
+from app.parser.html_archive import HtmlArchive, reextract_pages
+import json
+import sys
+
+def main():
+    """Утилита для повторного извлечения данных из архива HTML страниц"""
+    if not PARSER_ARCHIVE_DIR:
+        print("❌ Архив HTML страниц не настроен: укажите каталог в PARSER_ARCHIVE_DIR")
+        sys.exit(1)
+
+    archive = HtmlArchive()
+
+    if len(sys.argv) < 2:
+        print("Использование:")
+        print("  python manage_archive.py info                 - информация об архиве")
+        print("  python manage_archive.py extract [файл.json]  - заново извлечь описание и фото из архива")
+        print("  python manage_archive.py recache              - извлечь и обновить кэш парсинга")
+        print("Каталог архива задается PARSER_ARCHIVE_DIR")
+        return
+
+    command = sys.argv[1].lower()
+
+    if command == "info":
+        stats = archive.get_stats()
+        print("📊 Информация об архиве:")
+        print(f"   Путь: {stats['directory']}")
+        print(f"   Размер: {stats['size_mb']} MB")
+        print(f"   Объявлений: {stats['items']}")
+        print(f"   Страниц: {stats['pages']}")
+
+    elif command in ("extract", "recache"):
+        pages = archive.pages()
+        if not pages:
+            print(f"❌ Архив пуст: {archive.directory}")
+            return
+
+        print(f"🔧 Разбираем {len(pages)} страниц...")
+        cache = None
+        if command == "recache":
+            from app.database.parse_cache import get_parse_cache
+            cache = get_parse_cache()
+
+        results = {}
+        failed = 0
+        for page, url, result in reextract_pages(pages):
+            results[str(page['item'])] = {'url': url, 'fetched_at': page['fetched_at'].isoformat(), 'result': result}
+            if not result:
+                failed += 1
+            elif cache and isinstance(page['item'], int):
+                cache.put(result, item_id=page['item'], url=url)
+
+        print(f"✅ Извлечено: {len(pages) - failed}, не удалось: {failed}")
+
+        if command == "extract" and len(sys.argv) > 2:
+            with open(sys.argv[2], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"💾 Результаты сохранены: {sys.argv[2]}")
+
+    else:
+        print(f"❌ Неизвестная команда: {command}")
+
+if __name__ == "__main__":
+    main()